@@ -0,0 +1,226 @@
+import sys
+import time
+import argparse
+import numpy as np
+from engine import LiarsDiceGame
+
+NUM_PLAYERS = 2
+START_DICE = 5
+NO_BID = 0
+
+
+class BatchLiarsDice:
+    def __init__(self, num_games, num_dice=START_DICE, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.num_games = num_games
+        self.num_dice = num_dice
+
+        # dice[g, p, i] holds the face of die i, 0 once the die has been removed
+        self.dice = np.zeros((num_games, NUM_PLAYERS, num_dice), dtype=np.int8)
+        self.dice_left = np.full((num_games, NUM_PLAYERS), num_dice, dtype=np.int8)
+        self.bid_quantity = np.zeros(num_games, dtype=np.int16)
+        self.bid_face = np.full(num_games, NO_BID, dtype=np.int8)
+        self.current_player = np.zeros(num_games, dtype=np.int8)
+        self.round_active = np.ones(num_games, dtype=bool)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        self.winner = np.full(num_games, -1, dtype=np.int8)
+
+        self.roll_all_dice()
+
+    def all_games(self):
+        return np.ones(self.num_games, dtype=bool)
+
+    def roll_all_dice(self, mask=None):
+        if mask is None:
+            mask = self.all_games()
+
+        rolls = self.rng.integers(1, 7, size=self.dice.shape, dtype=np.int8)
+        slots = np.arange(self.num_dice, dtype=np.int8)
+        rolls[slots >= self.dice_left[:, :, None]] = 0
+        self.dice[mask] = rolls[mask]
+
+    def make_bid(self, quantity, face_value, mask=None):
+        if mask is None:
+            mask = self.all_games()
+
+        quantity = np.asarray(quantity)
+        face_value = np.asarray(face_value)
+
+        higher = (self.bid_face == NO_BID) | (quantity > self.bid_quantity) | ((quantity == self.bid_quantity) & (face_value > self.bid_face))
+        # The same rules as LiarsDiceGame.make_bid: a real face, and never
+        # more dice than are left in play.
+        in_range = (quantity >= 1) & (face_value >= 1) & (face_value <= 6) & (quantity <= self.dice_left.sum(axis=1))
+        valid = mask & self.round_active & ~self.game_over & higher & in_range
+
+        self.bid_quantity = np.where(valid, quantity, self.bid_quantity).astype(np.int16)
+        self.bid_face = np.where(valid, face_value, self.bid_face).astype(np.int8)
+        self.current_player[valid] = 1 - self.current_player[valid]
+        return valid
+
+    def count_bid(self):
+        face = self.bid_face[:, None, None]
+        matches = (self.dice == face).sum(axis=(1, 2))
+        wilds = (self.dice == 1).sum(axis=(1, 2))
+        return matches + np.where(self.bid_face != 1, wilds, 0)
+
+    def challenge(self, mask=None):
+        if mask is None:
+            mask = self.all_games()
+
+        valid = mask & self.round_active & ~self.game_over & (self.bid_face != NO_BID)
+        games = np.nonzero(valid)[0]
+
+        total_count = self.count_bid()[games]
+        challenger = self.current_player[games]
+        loser = np.where(total_count >= self.bid_quantity[games], challenger, 1 - challenger)
+
+        last_slot = self.dice_left[games, loser] - 1
+        self.dice[games, loser, last_slot] = 0
+        self.dice_left[games, loser] = last_slot
+
+        self.bid_quantity[games] = 0
+        self.bid_face[games] = NO_BID
+        self.round_active[games] = False
+
+        finished = games[last_slot == 0]
+        self.game_over[finished] = True
+        self.winner[finished] = 1 - loser[last_slot == 0]
+        return valid
+
+    def reset_games(self, mask):
+        self.dice_left[mask] = self.num_dice
+        self.bid_quantity[mask] = 0
+        self.bid_face[mask] = NO_BID
+        self.current_player[mask] = 0
+        self.round_active[mask] = True
+        self.game_over[mask] = False
+        self.winner[mask] = -1
+        self.roll_all_dice(mask)
+
+    def start_new_round(self, mask=None):
+        if mask is None:
+            mask = self.all_games()
+
+        self.reset_games(mask & self.game_over)
+
+        new_round = mask & ~self.round_active
+        self.roll_all_dice(new_round)
+        starters = self.rng.integers(0, NUM_PLAYERS, size=self.num_games, dtype=np.int8)
+        self.current_player[new_round] = starters[new_round]
+        self.bid_quantity[new_round] = 0
+        self.bid_face[new_round] = NO_BID
+        self.round_active[new_round] = True
+
+    def random_actions(self, challenge_prob=0.3):
+        # A random bot: raise the face if it can, otherwise the quantity,
+        # and challenge at random or once the bid exceeds the dice in play.
+        rng = self.rng
+        has_bid = self.bid_face != NO_BID
+        total_dice = self.dice_left.sum(axis=1)
+
+        raise_face = (rng.random(self.num_games) < 0.5) & has_bid & (self.bid_face < 6)
+        span = np.maximum(6 - self.bid_face, 1)
+        face = np.where(raise_face, self.bid_face + 1 + rng.integers(0, span), rng.integers(1, 7, size=self.num_games))
+        quantity = np.where(raise_face, self.bid_quantity, self.bid_quantity + 1)
+        quantity = np.where(has_bid, quantity, rng.integers(1, 3, size=self.num_games))
+
+        do_challenge = has_bid & ((rng.random(self.num_games) < challenge_prob) | (quantity > total_dice))
+        return do_challenge, quantity, face
+
+    def step(self, challenge_prob=0.3):
+        do_challenge, quantity, face = self.random_actions(challenge_prob)
+        self.challenge(do_challenge)
+        self.make_bid(quantity, face, ~do_challenge)
+
+    def play(self, num_finished, challenge_prob=0.3):
+        finished = 0
+        while finished < num_finished:
+            self.step(challenge_prob)
+
+            finished += int(self.game_over.sum())
+            self.start_new_round(~self.round_active)
+        return finished
+
+
+def sync_scalar(game, batch, g):
+    for p, dice_set in enumerate(game.players):
+        dice_set.set_values(batch.dice[g, p, :batch.dice_left[g, p]].tolist())
+    game.current_player = int(batch.current_player[g])
+
+
+def scalar_matches(game, batch, g):
+    bid = None
+    if batch.bid_face[g] != NO_BID:
+        bid = (int(batch.bid_quantity[g]), int(batch.bid_face[g]))
+
+    return (
+        game.current_bid == bid
+        and game.current_player == batch.current_player[g]
+        and [p.size() for p in game.players] == batch.dice_left[g].tolist()
+        and game.round_active == batch.round_active[g]
+        and game.game_over == batch.game_over[g]
+        and (game.winner if game.winner is not None else -1) == batch.winner[g]
+    )
+
+
+def check_consistency(num_games=200, steps=400, seed=0):
+    batch = BatchLiarsDice(num_games, seed=seed)
+    games = [LiarsDiceGame() for _ in range(num_games)]
+    for g, game in enumerate(games):
+        sync_scalar(game, batch, g)
+
+    mismatches = 0
+    for _ in range(steps):
+        do_challenge, quantity, face = batch.random_actions()
+
+        for g, game in enumerate(games):
+            player = game.current_player
+            if do_challenge[g]:
+                game.challenge(player)
+            else:
+                game.make_bid(player, int(quantity[g]), int(face[g]))
+
+        batch.challenge(do_challenge)
+        batch.make_bid(quantity, face, ~do_challenge)
+
+        for g, game in enumerate(games):
+            if not scalar_matches(game, batch, g):
+                mismatches += 1
+
+        restart = ~batch.round_active
+        batch.start_new_round(restart)
+        for g in np.nonzero(restart)[0]:
+            games[g].start_new_round()
+            sync_scalar(games[g], batch, g)
+
+    return mismatches
+
+
+def measure_throughput(num_games, num_finished, seed=None):
+    batch = BatchLiarsDice(num_games, seed=seed)
+    start = time.perf_counter()
+    finished = batch.play(num_finished)
+    elapsed = time.perf_counter() - start
+    return finished, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch Liar's Dice simulator")
+    parser.add_argument('--games', type=int, default=10000, help="games held in the batch at once")
+    parser.add_argument('--finished', type=int, default=200000, help="completed games to simulate")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--skip-check', action='store_true', help="skip the consistency check")
+    args = parser.parse_args(argv)
+
+    finished, elapsed = measure_throughput(args.games, args.finished, args.seed)
+    print(f"Simulated {finished} games in {elapsed:.2f}s ({finished / elapsed:,.0f} games/sec)")
+
+    if not args.skip_check:
+        mismatches = check_consistency()
+        print(f"Consistency check against LiarsDiceGame: {mismatches} mismatches")
+        if mismatches:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import time
+import random
+import argparse
+import itertools
+from functools import lru_cache
+
+import numpy as np
+
+from bots import ProbabilityBot
+from bids import bid_code
+from probability import FACES, QUANTITIES, FACE_VALUES, tail_table, matching_counts, legal_bids
+
+
+@lru_cache(maxsize=None)
+def compositions(num_dice):
+    # Every face-count histogram of num_dice dice, instead of every roll:
+    # 252 rows for five dice rather than 7776. Returns the counts, their
+    # probability before any bid, how many dice match each bid face, and a
+    # one-hot layout of those matches so a posterior turns into per-face
+    # count distributions with one matrix product.
+    hands = list(itertools.combinations_with_replacement(range(1, FACES + 1), num_dice))
+    counts = np.zeros((len(hands), FACES + 1), dtype=np.intp)
+    for i, hand in enumerate(hands):
+        for value in hand:
+            counts[i, value] += 1
+    factorials = np.cumprod([1] + list(range(1, num_dice + 1)), dtype=np.float64)
+    prior = factorials[num_dice] / factorials[counts[:, 1:]].prod(axis=1) / FACES ** num_dice
+    matching = counts.copy()
+    matching[:, 2:] += counts[:, 1:2]
+    indicator = np.zeros((len(hands), FACES + 1, num_dice + 1))
+    rows = np.arange(len(hands))[:, None]
+    indicator[rows, np.arange(FACES + 1), matching] = 1.0
+    for table in (counts, prior, matching, indicator):
+        table.setflags(write=False)
+    return counts, prior, matching, indicator.reshape(len(hands), -1)
+
+
+class BidderModel:
+    # A bidder who raises to the lowest bid they judge safe, as
+    # ProbabilityBot does. Going up from the standing bid, each legal bid is
+    # taken with a chance that rises smoothly through `threshold` as the
+    # bid becomes likelier from where they sit; `bluff` is the floor left
+    # for bids the model would never make.
+    def __init__(self, threshold=0.5, softness=0.03, bluff=0.05):
+        self.threshold = threshold
+        self.softness = softness
+        self.bluff = bluff
+
+    def likelihood(self, quantity, face_value, current_bid, matching, unknown_dice):
+        # One value per row of `matching`, the bidder's possible hands.
+        start = bid_code(current_bid) + 1
+        end = bid_code((quantity, face_value)) + 1
+        quantities = QUANTITIES[start:end]
+        faces = FACE_VALUES[start:end]
+        needed = np.clip(quantities - matching[:, faces], 0, unknown_dice + 1)
+        p = tail_table()[(faces == 1).astype(np.intp), unknown_dice, needed]
+        take = 1 / (1 + np.exp((self.threshold - p) / self.softness))
+        chosen = take[:, -1] * (1 - take[:, :-1]).prod(axis=1)
+        return self.bluff + (1 - self.bluff) * chosen
+
+
+class BeliefTracker:
+    # Public beliefs about every seat's dice, from the bids they make. A
+    # player asking about the table combines their own dice with everyone
+    # else's posterior. It takes the engine's log hooks, so
+    # LiarsDiceGame(log=tracker) keeps it up to date.
+    def __init__(self, num_players=2, model=None):
+        self.model = model or BidderModel()
+        self.player_counts = [0] * num_players
+        self.posteriors = [None] * num_players
+        self.current_bid = None
+
+    def new_round(self, player_counts):
+        self.player_counts = list(player_counts)
+        self.posteriors = [compositions(count)[1].copy() if count else None for count in self.player_counts]
+        self.current_bid = None
+
+    def observe_bid(self, player, quantity, face_value):
+        posterior = self.posteriors[player]
+        previous = self.current_bid
+        self.current_bid = (quantity, face_value)
+        if posterior is None:
+            return
+        count = self.player_counts[player]
+        matching = compositions(count)[2]
+        posterior *= self.model.likelihood(quantity, face_value, previous, matching, sum(self.player_counts) - count)
+        total = posterior.sum()
+        if total > 0:
+            posterior /= total
+        else:
+            # The model ruled out every hand; start this seat over.
+            posterior[:] = compositions(count)[1]
+
+    def face_distribution(self, player):
+        # dist[face, k]: probability that exactly k of the player's dice match face.
+        count = self.player_counts[player]
+        return (self.posteriors[player] @ compositions(count)[3]).reshape(FACES + 1, count + 1)
+
+    def expected_counts(self, player):
+        counts = compositions(self.player_counts[player])[0]
+        return self.posteriors[player] @ counts[:, 1:]
+
+    def others_matching(self, perspective):
+        # dist[face, k]: probability that exactly k dice outside the
+        # perspective's own match face.
+        dist = np.zeros((FACES + 1, 1))
+        dist[:, 0] = 1.0
+        for player, posterior in enumerate(self.posteriors):
+            if player == perspective or posterior is None:
+                continue
+            seat = self.face_distribution(player)
+            combined = np.zeros((FACES + 1, dist.shape[1] + seat.shape[1] - 1))
+            for k in range(seat.shape[1]):
+                combined[:, k:k + dist.shape[1]] += dist * seat[:, k:k + 1]
+            dist = combined
+        return dist
+
+    def tail(self, perspective):
+        # tail[face, k]: probability that at least k dice outside the
+        # perspective's own match face, with a trailing column of zeros.
+        dist = self.others_matching(perspective)
+        tail = np.zeros((FACES + 1, dist.shape[1] + 1))
+        tail[:, :-1] = np.cumsum(dist[:, ::-1], axis=1)[:, ::-1]
+        return tail
+
+    def bid_probability(self, quantity, face_value, my_dice, perspective):
+        tail = self.tail(perspective)
+        needed = min(max(quantity - matching_counts(my_dice)[face_value], 0), tail.shape[1] - 1)
+        return float(tail[face_value, needed])
+
+    def score_bids(self, my_dice, perspective, current_bid=None):
+        tail = self.tail(perspective)
+        quantities, faces = legal_bids(current_bid, len(my_dice) + tail.shape[1] - 2)
+        needed = np.clip(quantities - matching_counts(my_dice)[faces], 0, tail.shape[1] - 1)
+        return quantities, faces, tail[faces, needed]
+
+    def log_new_game(self, game):
+        # A new game comes with its first round already dealt.
+        self.new_round(game.dice_counts)
+
+    def log_rolls(self, game):
+        pass
+
+    def log_round(self, game):
+        self.new_round(game.dice_counts)
+
+    def log_bid(self, game, player, quantity, face_value):
+        self.observe_bid(player, quantity, face_value)
+
+    def log_challenge(self, game, player, loser, total_count):
+        pass
+
+
+class TimedTracker(BeliefTracker):
+    # Times every update, and scores the bidder's true hand under the
+    # posterior against the prior.
+    def __init__(self, num_players=2, model=None):
+        super().__init__(num_players, model)
+        self.updates = []
+        self.queries = []
+        self.gain = 0.0
+        self.scored = 0
+
+    def log_bid(self, game, player, quantity, face_value):
+        start = time.perf_counter()
+        self.observe_bid(player, quantity, face_value)
+        self.updates.append(time.perf_counter() - start)
+
+        hand = tuple(sorted(game.players[player].values))
+        counts, prior, _, _ = compositions(len(hand))
+        row = np.nonzero((counts[:, 1:] == np.bincount(hand, minlength=FACES + 1)[1:]).all(axis=1))[0][0]
+        self.gain += np.log(self.posteriors[player][row] / prior[row])
+        self.scored += 1
+
+        start = time.perf_counter()
+        self.score_bids(game.players[game.current_player].values, game.current_player, game.current_bid)
+        self.queries.append(time.perf_counter() - start)
+
+
+class BeliefBot(ProbabilityBot):
+    # ProbabilityBot, judging bids against what the others' bids say about
+    # their dice rather than against uniform dice. It only sees views, so
+    # it learns from the standing bid at each of its turns; with more than
+    # two players, bids made in between are missed.
+    name = 'belief'
+
+    def __init__(self, rng=None, model=None):
+        super().__init__(rng)
+        self.tracker = BeliefTracker(model=model)
+        self.counts = None
+
+    def observe(self, view):
+        counts = view['player_counts']
+        bid = view['current_bid']
+        standing = self.tracker.current_bid
+        # Every round costs someone a die, and bids only go up within one.
+        if counts != self.counts or bid is None or (standing is not None and bid <= standing):
+            self.tracker.new_round(counts)
+            self.counts = list(counts)
+        if bid is not None and bid != self.tracker.current_bid:
+            bidder = (view['perspective'] - 1) % len(counts)
+            while not counts[bidder]:
+                bidder = (bidder - 1) % len(counts)
+            self.tracker.observe_bid(bidder, *bid)
+
+    def choose_action(self, view):
+        self.observe(view)
+        return self.act(view)
+
+    def act(self, view):
+        # Decide from the tracker as it stands, without reading the view's bid.
+        me = view['perspective']
+        my_dice = self.own_dice(view)
+        bid = view['current_bid']
+
+        if bid is not None and self.tracker.bid_probability(bid[0], bid[1], my_dice, me) < self.challenge_threshold:
+            return ('challenge',)
+
+        quantities, faces, probs = self.tracker.score_bids(my_dice, me, bid)
+        if len(probs) == 0:
+            return ('challenge',)
+
+        safe = (probs >= self.bid_threshold).nonzero()[0]
+        if len(safe):
+            choice = safe[0]
+        elif bid is not None:
+            return ('challenge',)
+        else:
+            choice = probs.argmax()
+        action = ('bid', int(quantities[choice]), int(faces[choice]))
+        self.tracker.observe_bid(me, action[1], action[2])
+        return action
+
+
+def main(argv=None):
+    from engine import LiarsDiceGame
+    from bots import make_bot
+    from tournament import play_game
+
+    parser = argparse.ArgumentParser(description="Track beliefs about hidden dice from the bids made")
+    parser.add_argument('--dice', type=int, default=5, help="dice per player")
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Follow ProbabilityBot games with a tracker that times and scores
+    # every update.
+    rng = random.Random(args.seed)
+    tracker = TimedTracker(args.players)
+    game = LiarsDiceGame(args.players, args.dice, rng=rng, log=tracker)
+    bots = [make_bot('probability', random.Random(args.seed + i)) for i in range(args.players)]
+    for _ in range(args.games):
+        play_game(bots, rng, game=game)
+
+    updates = np.array(tracker.updates) * 1e6
+    queries = np.array(tracker.queries) * 1e6
+    gain = tracker.gain
+    scored = tracker.scored
+    print(f"Tracker update per bid: p50 {np.percentile(updates, 50):.1f} us, p99 {np.percentile(updates, 99):.1f} us "
+          f"over {len(updates):,} bids")
+    print(f"Scoring every legal bid against the beliefs: p50 {np.percentile(queries, 50):.1f} us, p99 {np.percentile(queries, 99):.1f} us")
+    print(f"After each bid the bidder's true hand is {np.exp(gain / max(scored, 1)):.2f}x as likely under the posterior "
+          f"as under the prior (geometric mean)")
+
+    wins = 0
+    start = time.perf_counter()
+    for i in range(args.games):
+        bots = [BeliefBot(random.Random(f"{args.seed}:{i}")), make_bot('probability', random.Random(f"{args.seed}:{i}:p"))]
+        seat = i % 2
+        if seat:
+            bots.reverse()
+        wins += play_game(bots, rng, args.dice) == seat
+    elapsed = time.perf_counter() - start
+    print(f"BeliefBot won {wins}/{args.games} two-player games against ProbabilityBot in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
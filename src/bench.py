@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import statistics
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from engine import DiceSet, LiarsDiceGame
+from dicerng import make_rng
+from bots import make_bot
+from tournament import play_game
+
+RESOLUTIONS = [(1920, 1080), (2560, 1440), (3840, 2160)]
+
+
+# Each case runs `n` operations and returns the seconds they took, so cases
+# can leave their setup out of the timing.
+
+def roll_all_case(kind):
+    def bench_roll_all(n):
+        dice = DiceSet(5, make_rng(kind, 0))
+        start = time.perf_counter()
+        for _ in range(n):
+            dice.roll_all()
+        return time.perf_counter() - start
+    return bench_roll_all
+
+
+def bench_count_value(n):
+    dice = DiceSet(5, random.Random(0))
+    start = time.perf_counter()
+    for i in range(n):
+        dice.count_value(i % 6 + 1)
+    return time.perf_counter() - start
+
+
+def bench_make_bid(n):
+    game = LiarsDiceGame(2, rng=random.Random(0))
+    elapsed = 0.0
+    for i in range(n):
+        if i % 30 == 0:
+            game.start_new_round()
+        player = game.current_player
+        quantity = i % 30 // 6 + 1
+        start = time.perf_counter()
+        game.make_bid(player, quantity, i % 6 + 1)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def bench_challenge(n):
+    game = LiarsDiceGame(2, 40, rng=random.Random(0))
+    elapsed = 0.0
+    for i in range(n):
+        if game.game_over or game.dice_counts[0] < 2 or game.dice_counts[1] < 2:
+            game = LiarsDiceGame(2, 40, rng=random.Random(i))
+        game.start_new_round()
+        game.make_bid(game.current_player, 3, 4)
+        start = time.perf_counter()
+        game.challenge(game.current_player)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def bench_get_player_view(n):
+    game = LiarsDiceGame(2, rng=random.Random(0))
+    game.start_new_round()
+    start = time.perf_counter()
+    for i in range(n):
+        game.get_player_view(i % 2)
+    return time.perf_counter() - start
+
+
+def bench_random_games(n):
+    rng = random.Random(0)
+    bots = [make_bot('random', random.Random(1)), make_bot('random', random.Random(2))]
+    start = time.perf_counter()
+    for _ in range(n):
+        play_game(bots, rng)
+    return time.perf_counter() - start
+
+
+def draw_case(resolution, retained):
+    def bench_draw(n):
+        import project
+
+        gui = project.DiceGUI(resolution=resolution, fullscreen=False, retained=retained)
+        gui.game.start_new_round()
+        gui.draw()
+        start = time.perf_counter()
+        game = gui.game
+        for _ in range(n):
+            # Every frame follows one real bid, raising the quantity on sixes
+            # until the table runs out of dice and a new round is dealt.
+            # Retained frames redraw what that bid changed; full frames
+            # repaint everything.
+            quantity = game.current_bid[0] + 1 if game.current_bid else 1
+            if not game.make_bid(game.current_player, quantity, 6):
+                game.start_new_round()
+            gui.draw()
+        elapsed = time.perf_counter() - start
+        project.pygame.quit()
+        return elapsed
+    return bench_draw
+
+
+CASES = {
+    'dice.roll_all': (roll_all_case('python'), 'rolls/sec'),
+    'dice.roll_all.bytes': (roll_all_case('bytes'), 'rolls/sec'),
+    'dice.roll_all.numpy': (roll_all_case('numpy'), 'rolls/sec'),
+    'dice.roll_all.secure': (roll_all_case('secure'), 'rolls/sec'),
+    'dice.count_value': (bench_count_value, 'calls/sec'),
+    'game.make_bid': (bench_make_bid, 'calls/sec'),
+    'game.challenge': (bench_challenge, 'calls/sec'),
+    'game.get_player_view': (bench_get_player_view, 'calls/sec'),
+    'play.random_games': (bench_random_games, 'games/sec'),
+}
+for w, h in RESOLUTIONS:
+    CASES[f'gui.draw_full.{w}x{h}'] = (draw_case((w, h), False), 'frames/sec')
+    CASES[f'gui.draw_retained.{w}x{h}'] = (draw_case((w, h), True), 'frames/sec')
+
+
+def measure(func, min_time, repeats):
+    # Grow n until one run takes min_time, then keep the median rate of
+    # several runs of that size.
+    n = 1
+    while True:
+        elapsed = func(n)
+        if elapsed >= min_time or n >= 1 << 24:
+            break
+        n = max(n * 2, int(n * min_time / max(elapsed, 1e-9) * 1.2))
+    rates = [n / elapsed] + [n / func(n) for _ in range(repeats - 1)]
+    return statistics.median(rates), n
+
+
+def run(names, min_time, repeats):
+    results = {}
+    for name in names:
+        func, unit = CASES[name]
+        rate, n = measure(func, min_time, repeats)
+        results[name] = {'rate': rate, 'unit': unit, 'n': n}
+        print(f"{name:<32} {rate:>14,.1f} {unit}")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Rates are higher-is-better, so a drop of more than `threshold` is a regression.
+    regressions = []
+    print(f"{'case':<32} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>14} {result['rate']:>14,.1f}      new")
+            continue
+        change = result['rate'] / base['rate'] - 1
+        flag = ''
+        if change < -threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<32} {base['rate']:>14,.1f} {result['rate']:>14,.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine and headless rendering")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the suite and save the results as JSON")
+    run_parser.add_argument('--output', default='bench.json')
+    run_parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    run_parser.add_argument('--min-time', type=float, default=0.2, help="seconds per timed run")
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--baseline', help="compare against this saved run afterwards")
+    run_parser.add_argument('--threshold', type=float, default=0.1, help="slowdown that counts as a regression")
+
+    compare_parser = commands.add_parser('compare', help="compare two saved runs")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help="slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        current = run(args.cases, args.min_time, args.repeats)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved {args.output}")
+        if not args.baseline:
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+    print()
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import gc
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+from engine import GamePool, LiarsDiceGame
+from bots import make_bot
+from tournament import play_game
+
+
+class PauseTimer:
+    # Times every garbage collection through gc.callbacks.
+    def __init__(self):
+        self.pauses = []
+        self.collections = [0, 0, 0]
+        self.started = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self.started = time.perf_counter()
+        else:
+            self.pauses.append(time.perf_counter() - self.started)
+            self.collections[info['generation']] += 1
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+def replace(mode, tables, slot, pool, rng):
+    # A finished game makes way for the next one at its table: a new
+    # LiarsDiceGame, the same one reset in place, or one from the pool.
+    if mode == 'new':
+        tables[slot] = LiarsDiceGame(2, rng=rng)
+    elif mode == 'reset':
+        tables[slot].reset()
+    else:
+        pool.release(tables[slot])
+        tables[slot] = pool.acquire(2)
+
+
+def setup(num_tables, seed):
+    # num_tables games stay alive at once, as on a busy server.
+    rng = random.Random(seed)
+    bots = [make_bot('random', random.Random(seed + 1)), make_bot('random', random.Random(seed + 2))]
+    pool = GamePool(rng)
+    tables = [pool.acquire(2) for _ in range(num_tables)]
+    gc.collect()
+    return rng, bots, pool, tables
+
+
+def measure_time(mode, num_tables, num_games, seed):
+    rng, bots, pool, tables = setup(num_tables, seed)
+    clock = time.perf_counter
+    swapping = 0.0
+    start = clock()
+    with PauseTimer() as timer:
+        for i in range(num_games):
+            slot = i % num_tables
+            play_game(bots, rng, game=tables[slot])
+            swap_start = clock()
+            replace(mode, tables, slot, pool, rng)
+            swapping += clock() - swap_start
+    return num_games / (clock() - start), swapping / num_games, timer
+
+
+def measure_memory(mode, num_tables, num_games, seed):
+    # Blocks still allocated after each swap, with the old game kept alive
+    # until then, are what starting a game allocates; traced memory still
+    # live at the end is what the run left behind.
+    rng, bots, pool, tables = setup(num_tables, seed)
+    blocks = 0
+    tracemalloc.start()
+    for i in range(num_games):
+        slot = i % num_tables
+        play_game(bots, rng, game=tables[slot])
+        old = tables[slot]
+        allocated = sys.getallocatedblocks()
+        replace(mode, tables, slot, pool, rng)
+        blocks += sys.getallocatedblocks() - allocated
+        del old
+    live, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return blocks / num_games, live / 1024, peak / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Allocations and GC pauses per game, with and without reusing games")
+    parser.add_argument('--tables', type=int, default=10000, help="games kept alive at once")
+    parser.add_argument('--games', type=int, default=20000, help="games played and replaced in the timed run")
+    parser.add_argument('--traced-games', type=int, default=2000, help="games played under tracemalloc")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<6} {'games/sec':>10} {'swap us':>8} {'gen0/1/2 GCs':>13} {'max pause ms':>13} {'total pause ms':>15} "
+          f"{'blocks/game':>12} {'live KB':>9} {'peak KB':>9}")
+    for mode in ('new', 'reset', 'pool'):
+        rate, swap, timer = measure_time(mode, args.tables, args.games, args.seed)
+        blocks, live, peak = measure_memory(mode, args.tables, args.traced_games, args.seed)
+        collections = '/'.join(str(c) for c in timer.collections)
+        print(f"{mode:<6} {rate:>10,.0f} {swap * 1e6:>8.1f} {collections:>13} {max(timer.pauses, default=0.0) * 1000:>13.2f} "
+              f"{sum(timer.pauses) * 1000:>15.1f} {blocks:>12.1f} {live:>9.1f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import project
+from bots import MonteCarloBot
+
+
+class BotMatchGUI(project.DiceGUI):
+    # Every seat is a bot and rounds restart by themselves, so the loop
+    # spends its whole run waiting on bot turns.
+    def __init__(self, duration, inline=False, **kwargs):
+        super().__init__(**kwargs)
+        self.duration = duration
+        self.inline = inline
+        self.frame_times = []
+        self.turns = 0
+
+    def handle_events(self):
+        if time.perf_counter() - self.started >= self.duration:
+            self.running = False
+        if not self.game.round_active:
+            self.game.start_new_round()
+        super().handle_events()
+
+    def apply_bot_action(self, event):
+        self.turns += 1
+        super().apply_bot_action(event)
+
+    def update_bots(self):
+        if not self.inline:
+            return super().update_bots()
+        # What a bot would cost if it ran its search on the render thread.
+        game = self.game
+        if game.round_active and not game.game_over:
+            seat = game.current_player
+            runner = self.bot_runner
+            runner.pending = (game, seat, game.version)
+            action = runner.bots[seat].choose_action(game.get_player_view(seat))
+            self.post_bot_action(seat, game.version, action)
+
+    def measure(self, fps):
+        self.game.start_new_round()
+        self.started = time.perf_counter()
+        self.running = True
+        last = self.started
+        while self.running:
+            self.handle_events()
+            self.update_bots()
+            self.draw()
+            self.clock.tick(fps)
+            now = time.perf_counter()
+            self.frame_times.append((now - last) * 1000)
+            last = now
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worst-case DiceGUI frame time while bots are thinking")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--think', type=float, default=0.25, help="bot time budget per turn, in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-worst-ms', type=float, default=50.0,
+                        help="fail if a frame takes longer than this while bots think off the render thread")
+    args = parser.parse_args(argv)
+
+    # The render-thread run is only there for comparison; the other two
+    # must keep every frame under the bound while completing bot turns.
+    modes = (("render thread", dict(inline=True), False), ("worker thread", dict(bot_processes=False), True),
+             ("worker process", dict(bot_processes=True), True))
+    failures = []
+    for name, options, bounded in modes:
+        bots = {seat: MonteCarloBot(random.Random(f"{args.seed}:{seat}")) for seat in range(2)}
+        gui = BotMatchGUI(args.seconds, bots=bots, think_time=args.think, retained=False, **options)
+        gui.measure(args.fps)
+        gui.bot_runner.close()
+        frames = gui.frame_times[1:]
+        print(f"{name:<15} turns {gui.turns:4d}  frames {len(frames):5d}  frame p50 {percentile(frames, 50):6.2f} ms  "
+              f"p99 {percentile(frames, 99):6.2f} ms  worst {max(frames):7.2f} ms")
+        project.pygame.quit()
+        if bounded and not gui.turns:
+            failures.append(f"{name}: no bot turns completed")
+        elif bounded and max(frames) > args.max_worst_ms:
+            failures.append(f"{name}: worst frame {max(frames):.2f} ms over {args.max_worst_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
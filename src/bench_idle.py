@@ -0,0 +1,78 @@
+import os
+import time
+import argparse
+import threading
+import statistics
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import project
+
+
+class ProbeGUI(project.DiceGUI):
+    def __init__(self, duration):
+        super().__init__()
+        self.duration = duration
+        self.probe_event = project.pygame.event.custom_type()
+        self.latencies = []
+        self.frames = 0
+
+    def handle_events(self):
+        pygame = project.pygame
+        now = time.perf_counter()
+        for event in self.pending_events + pygame.event.get(self.probe_event):
+            if event.type == self.probe_event:
+                self.latencies.append((now - event.sent) * 1000)
+        self.pending_events = [e for e in self.pending_events if e.type != self.probe_event]
+
+        if now - self.started >= self.duration:
+            self.running = False
+        self.frames += 1
+        super().handle_events()
+
+    def measure(self, event_driven, fps, probe_interval):
+        pygame = project.pygame
+
+        def send_probes():
+            while self.running:
+                time.sleep(probe_interval)
+                pygame.event.post(pygame.event.Event(self.probe_event, sent=time.perf_counter()))
+
+        self.started = time.perf_counter()
+        self.running = True
+        sender = threading.Thread(target=send_probes, daemon=True)
+        sender.start()
+
+        cpu_start = time.process_time()
+        self.game.start_new_round()
+        self.loop(event_driven, fps)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - self.started
+        sender.join()
+        return cpu / wall * 100
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare idle CPU and wake-up latency of the DiceGUI loop modes")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--probe-interval', type=float, default=0.25, help="seconds between simulated input events")
+    args = parser.parse_args(argv)
+
+    for name, event_driven in (("polling loop", False), ("event-driven loop", True)):
+        gui = ProbeGUI(args.seconds)
+        cpu = gui.measure(event_driven, args.fps, args.probe_interval)
+        latencies = gui.latencies
+        print(f"{name:<18} cpu {cpu:5.1f}%  frames {gui.frames:5d}  "
+              f"wake-up p50 {statistics.median(latencies):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms")
+        project.pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = [
+    ("python interpreter", "pass"),
+    ("import engine", "import engine"),
+    ("import project", "import project"),
+    ("engine + new game", "import engine; engine.LiarsDiceGame().start_new_round()"),
+    ("DiceGUI startup", "import project; project.DiceGUI()"),
+]
+
+
+def time_command(code, runs):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start time of the engine and GUI")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    baseline = None
+    for name, code in CASES:
+        samples = time_command(code, args.runs)
+        median = statistics.median(samples)
+        if baseline is None:
+            baseline = median
+        print(f"{name:<20} median {median:7.1f} ms   (+{median - baseline:6.1f} ms over interpreter)")
+
+
+if __name__ == "__main__":
+    main()
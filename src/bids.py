@@ -0,0 +1,60 @@
+from array import array
+
+FACES = 6
+MAX_DICE = 255
+NO_BID = -1
+
+# A bid is ranked by quantity, then face, which is exactly the order
+# make_bid enforces: code = (quantity - 1) * 6 + (face - 1). Every legal
+# answer to a bid is a higher code, and with `total` dice in play the
+# codes stop at total * 6, so legal bids are always one contiguous slice
+# of these tables.
+QUANTITY = array('B', [code // FACES + 1 for code in range(MAX_DICE * FACES)])
+FACE = array('B', [code % FACES + 1 for code in range(MAX_DICE * FACES)])
+
+# (quantity, face) -> code for every valid bid, so one lookup both checks
+# the ranges and encodes.
+BID_CODES = {(QUANTITY[code], FACE[code]): code for code in range(MAX_DICE * FACES)}
+
+# MIN_QUANTITY[(code + 1) * 6 + face - 1]: the lowest quantity that may be
+# bid on `face` after bid `code` (NO_BID included).
+MIN_QUANTITY = array('H', [
+    (code - (face - 1)) // FACES + 2 if code >= 0 else 1
+    for code in range(NO_BID, MAX_DICE * FACES)
+    for face in range(1, FACES + 1)
+])
+
+
+def encode_bid(quantity, face_value):
+    return (quantity - 1) * FACES + (face_value - 1)
+
+
+def decode_bid(code):
+    return code // FACES + 1, code % FACES + 1
+
+
+def bid_code(bid):
+    return NO_BID if bid is None else encode_bid(*bid)
+
+
+def num_bids(total_dice):
+    return total_dice * FACES
+
+
+def legal_codes(current_code, total_dice):
+    return range(current_code + 1, num_bids(total_dice))
+
+
+def legal_bids(current_code, total_dice):
+    # (quantities, faces) of every legal next bid, lowest first.
+    end = num_bids(total_dice)
+    return QUANTITY[current_code + 1:end], FACE[current_code + 1:end]
+
+
+def is_legal(current_code, quantity, face_value, total_dice):
+    code = BID_CODES.get((quantity, face_value))
+    return code is not None and current_code < code < num_bids(total_dice)
+
+
+def min_quantity(current_code, face_value):
+    return MIN_QUANTITY[(current_code + 1) * FACES + face_value - 1]
@@ -0,0 +1,169 @@
+import random
+from probability import bid_probability, score_bids
+
+
+class Bot:
+    name = 'bot'
+
+    def __init__(self, rng=None):
+        self.rng = rng or random
+
+    def choose_action(self, view):
+        raise NotImplementedError
+
+    def search(self, view):
+        # Anytime interface: yields successively better actions, so a caller
+        # with a deadline can stop iterating and keep the last one.
+        yield self.choose_action(view)
+
+    def own_dice(self, view):
+        return view['dice'][view['perspective']]
+
+    def unknown_dice(self, view):
+        return sum(view['player_counts']) - view['player_counts'][view['perspective']]
+
+
+class RandomBot(Bot):
+    name = 'random'
+
+    def __init__(self, rng=None, challenge_prob=0.3):
+        super().__init__(rng)
+        self.challenge_prob = challenge_prob
+
+    def choose_action(self, view):
+        bid = view['current_bid']
+        total_dice = sum(view['player_counts'])
+        if bid is None:
+            return ('bid', 1, self.rng.randint(1, 6))
+
+        q, v = bid
+        if self.rng.random() < self.challenge_prob or q >= total_dice:
+            return ('challenge',)
+        if v < 6 and self.rng.random() < 0.5:
+            return ('bid', q, self.rng.randint(v + 1, 6))
+        return ('bid', q + 1, self.rng.randint(1, 6))
+
+
+class ProbabilityBot(Bot):
+    name = 'probability'
+
+    def __init__(self, rng=None, bid_threshold=0.5, challenge_threshold=0.4):
+        super().__init__(rng)
+        self.bid_threshold = bid_threshold
+        self.challenge_threshold = challenge_threshold
+
+    def choose_action(self, view):
+        my_dice = self.own_dice(view)
+        unknown = self.unknown_dice(view)
+        bid = view['current_bid']
+
+        if bid is not None and bid_probability(bid[0], bid[1], my_dice, unknown) < self.challenge_threshold:
+            return ('challenge',)
+
+        quantities, faces, probs = score_bids(my_dice, unknown, bid)
+        if len(probs) == 0:
+            return ('challenge',)
+
+        # Bids come out lowest first, so the first safe one raises the least.
+        safe = (probs >= self.bid_threshold).nonzero()[0]
+        if len(safe):
+            choice = safe[0]
+        elif bid is not None:
+            return ('challenge',)
+        else:
+            choice = probs.argmax()
+        return ('bid', int(quantities[choice]), int(faces[choice]))
+
+
+class BoldBot(ProbabilityBot):
+    name = 'bold'
+
+    def __init__(self, rng=None):
+        super().__init__(rng, bid_threshold=0.3, challenge_threshold=0.2)
+
+
+class CautiousBot(ProbabilityBot):
+    name = 'cautious'
+
+    def __init__(self, rng=None):
+        super().__init__(rng, bid_threshold=0.7, challenge_threshold=0.5)
+
+
+class MonteCarloBot(Bot):
+    # Samples the hidden dice and plays each candidate out to the end of the
+    # round with ProbabilityBot on every seat. search() refines the estimates
+    # one batch of samples at a time; choose_action() runs a fixed number.
+    name = 'montecarlo'
+
+    def __init__(self, rng=None, candidates=4, batch_size=16, batches=8):
+        super().__init__(rng)
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.batches = batches
+        self.policy = ProbabilityBot(self.rng)
+
+    def candidate_actions(self, view):
+        my_dice = self.own_dice(view)
+        bid = view['current_bid']
+        quantities, faces, probs = score_bids(my_dice, self.unknown_dice(view), bid)
+        best = probs.argsort(kind='stable')[::-1][:self.candidates]
+        actions = [('bid', int(quantities[i]), int(faces[i])) for i in sorted(best)]
+        if bid is not None:
+            actions.append(('challenge',))
+        return actions
+
+    def sample_dice(self, view):
+        me = view['perspective']
+        return [list(self.own_dice(view)) if i == me else [self.rng.randint(1, 6) for _ in range(count)]
+                for i, count in enumerate(view['player_counts'])]
+
+    def rollout(self, dice, player, action, bid, bidder):
+        # Returns the seat that loses a die when the round ends.
+        counts = [len(d) for d in dice]
+        total = sum(counts)
+        while True:
+            if action[0] == 'bid' and (bid is None or action[1:] > bid) and action[1] <= total:
+                bid = action[1:]
+                bidder = player
+                player = (player + 1) % len(dice)
+                while not counts[player]:
+                    player = (player + 1) % len(dice)
+            elif bid is not None:
+                matching = sum(1 for values in dice for v in values if v == bid[1] or (bid[1] != 1 and v == 1))
+                return player if matching >= bid[0] else bidder
+            else:
+                action = ('bid', 1, 2)
+                continue
+            view = {'dice': dice, 'perspective': player, 'player_counts': counts, 'current_bid': bid}
+            action = self.policy.choose_action(view)
+
+    def search(self, view):
+        me = view['perspective']
+        actions = self.candidate_actions(view)
+        if not actions:
+            yield ('challenge',)
+            return
+
+        wins = [0] * len(actions)
+        yield actions[0]
+        while True:
+            for _ in range(self.batch_size):
+                dice = self.sample_dice(view)
+                for i, action in enumerate(actions):
+                    if self.rollout(dice, me, action, view['current_bid'], None) != me:
+                        wins[i] += 1
+            yield actions[max(range(len(actions)), key=wins.__getitem__)]
+
+    def choose_action(self, view):
+        action = None
+        for i, action in enumerate(self.search(view)):
+            if i >= self.batches:
+                break
+        return action
+
+
+BOTS = {bot.name: bot for bot in [RandomBot, ProbabilityBot, BoldBot, CautiousBot]}
+
+
+def make_bot(name, rng=None):
+    return BOTS[name](rng)
@@ -0,0 +1,414 @@
+import os
+import time
+import argparse
+from math import factorial
+from collections import Counter
+from itertools import combinations_with_replacement
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from bids import encode_bid, decode_bid, bid_code
+from bots import Bot, ProbabilityBot
+
+FACES = 6
+# Regret and strategy tables together may not grow past this.
+MAX_TABLE_BYTES = 4 * 2 ** 30
+
+
+def rolls_for(num_dice):
+    rolls = list(combinations_with_replacement(range(1, FACES + 1), num_dice))
+    probs = []
+    for roll in rolls:
+        ways = factorial(num_dice)
+        for count in Counter(roll).values():
+            ways //= factorial(count)
+        probs.append(ways / FACES ** num_dice)
+    return rolls, np.array(probs)
+
+
+def matching_counts(roll):
+    counts = np.zeros(FACES + 1, dtype=np.int8)
+    for face in range(1, FACES + 1):
+        counts[face] = sum(1 for d in roll if d == face or (face != 1 and d == 1))
+    return counts
+
+
+class EndgameGame:
+    # One round between two players holding dice[0] and dice[1] dice, where
+    # player 0 opens. The challenger or the bidder loses: payoff +1 / -1.
+    def __init__(self, dice=(1, 1), recall=None):
+        self.dice = tuple(dice)
+        self.recall = recall
+        self.num_bids = sum(self.dice) * FACES
+        self.challenge_action = self.num_bids
+        self.num_actions = self.num_bids + 1
+
+        self.rolls = []
+        self.probs = []
+        counts = []
+        for n in self.dice:
+            rolls, probs = rolls_for(n)
+            self.rolls.append(rolls)
+            self.probs.append(probs)
+            counts.append(np.array([matching_counts(roll) for roll in rolls]))
+        self.roll_index = [{roll: i for i, roll in enumerate(rolls)} for rolls in self.rolls]
+
+        # truth[b, r0, r1]: whether bid b holds for that pair of rolls
+        self.truth = np.empty((self.num_bids, len(self.rolls[0]), len(self.rolls[1])), dtype=bool)
+        for b in range(self.num_bids):
+            q, f = decode_bid(b)
+            self.truth[b] = counts[0][:, f][:, None] + counts[1][:, f][None, :] >= q
+
+        if recall is None:
+            # A bitmask with an even number of bids is player 0's to act on
+            # and an odd one player 1's, so each player's table only needs
+            # half of them: the top bit follows from the rest.
+            self.num_histories = 2 ** (self.num_bids - 1)
+        else:
+            self.num_histories = (self.num_bids + 1) ** recall
+
+    def row(self, key):
+        # Row of the acting player's table for history key.
+        if self.recall is None:
+            return key & (self.num_histories - 1)
+        return key
+
+    def table_bytes(self):
+        # Both players' regret and strategy tables, as float32.
+        return 2 * 4 * sum(self.num_histories * len(rolls) * self.num_actions for rolls in self.rolls)
+
+    def history_key(self, key, rank):
+        # Full recall keeps every bid as a bitmask; otherwise only the last
+        # `recall` bids are remembered, as base (num_bids + 1) digits.
+        if self.recall is None:
+            return key | (1 << rank)
+        base = self.num_bids + 1
+        return (key * base + rank + 1) % base ** self.recall
+
+    def legal_mask(self, last):
+        mask = np.zeros(self.num_actions, dtype=np.float32)
+        mask[last + 1:self.num_bids] = 1
+        if last >= 0:
+            mask[self.challenge_action] = 1
+        return mask
+
+    def actions(self, last):
+        actions = list(range(last + 1, self.num_bids))
+        if last >= 0:
+            actions.append(self.challenge_action)
+        return actions
+
+    def terminal_values(self, last, challenger, reach):
+        # Counterfactual values of both players after `challenger` calls bid `last`.
+        sign = 1.0 if challenger == 1 else -1.0
+        u0 = sign * (2.0 * self.truth[last] - 1.0)
+        return [u0 @ reach[1], -(reach[0] @ u0)]
+
+
+def regret_matching(regrets, mask):
+    positive = np.maximum(regrets, 0) * mask
+    total = positive.sum(axis=1, keepdims=True)
+    uniform = np.broadcast_to(mask / mask.sum(), positive.shape)
+    return np.where(total > 0, positive / np.where(total > 0, total, 1), uniform)
+
+
+def traverse(game, regrets, player, key, last, reach, deltas):
+    if not reach[0].any() and not reach[1].any():
+        return [np.zeros(len(game.rolls[0])), np.zeros(len(game.rolls[1]))]
+
+    opponent = 1 - player
+    mask = game.legal_mask(last)
+    sigma = regret_matching(regrets[player][game.row(key)], mask)
+
+    child_values = {}
+    node_value = np.zeros(len(game.rolls[player]))
+    opponent_value = np.zeros(len(game.rolls[opponent]))
+    for action in game.actions(last):
+        child_reach = list(reach)
+        child_reach[player] = reach[player] * sigma[:, action]
+        if action == game.challenge_action:
+            values = game.terminal_values(last, player, child_reach)
+        else:
+            values = traverse(game, regrets, opponent, game.history_key(key, action), action, child_reach, deltas)
+        child_values[action] = values[player]
+        node_value += sigma[:, action] * values[player]
+        opponent_value += values[opponent]
+
+    regret_delta, strategy_delta = deltas.setdefault((player, key), (np.zeros(sigma.shape), np.zeros(sigma.shape)))
+    for action, value in child_values.items():
+        regret_delta[:, action] += value - node_value
+    strategy_delta += reach[player][:, None] * sigma
+
+    values = [None, None]
+    values[player] = node_value
+    values[opponent] = opponent_value
+    return values
+
+
+def best_response(game, strategies, br_player, player, key, last, reach):
+    # Values for br_player when they best-respond per public node to the
+    # other player's fixed strategy.
+    opponent = 1 - player
+    if player != br_player:
+        sigma = strategies[player][game.row(key)]
+    br_value = None
+    for action in game.actions(last):
+        child_reach = list(reach)
+        if player != br_player:
+            child_reach[player] = reach[player] * sigma[:, action]
+        if action == game.challenge_action:
+            value = game.terminal_values(last, player, child_reach)[br_player]
+        else:
+            value = best_response(game, strategies, br_player, opponent, game.history_key(key, action), action, child_reach)
+        if br_value is None:
+            br_value = value
+        elif player == br_player:
+            br_value = np.maximum(br_value, value)
+        else:
+            br_value = br_value + value
+    return br_value
+
+
+worker_game = None
+worker_regrets = None
+worker_memory = None
+
+
+def init_worker(dice, recall, tables):
+    # Workers read the solver's regret tables in place from shared memory;
+    # only the subtree deltas travel back.
+    global worker_game, worker_regrets, worker_memory
+    worker_game = EndgameGame(dice, recall)
+    worker_memory = [SharedMemory(name) for name, _ in tables]
+    worker_regrets = [np.ndarray(shape, dtype=np.float32, buffer=memory.buf) for memory, (_, shape) in zip(worker_memory, tables)]
+
+
+def traverse_subtree(player, key, last, reach):
+    deltas = {}
+    values = traverse(worker_game, worker_regrets, player, key, last, reach, deltas)
+    return values, deltas
+
+
+def merge_deltas(total, deltas):
+    for node, (regret_delta, strategy_delta) in deltas.items():
+        if node in total:
+            total[node][0][...] += regret_delta
+            total[node][1][...] += strategy_delta
+        else:
+            total[node] = (regret_delta, strategy_delta)
+    return total
+
+
+class CFRSolver:
+    def __init__(self, dice=(1, 1), recall=None, max_bytes=MAX_TABLE_BYTES):
+        self.game = EndgameGame(dice, recall)
+        if self.game.table_bytes() > max_bytes:
+            raise ValueError(f"tables for dice {self.game.dice} need {self.game.table_bytes() / 1e9:.1f} GB; "
+                             f"use a shorter --recall")
+        shapes = [(self.game.num_histories, len(rolls), self.game.num_actions) for rolls in self.game.rolls]
+        self.regrets = [np.zeros(shape, dtype=np.float32) for shape in shapes]
+        self.strategy_sums = [np.zeros(shape, dtype=np.float32) for shape in shapes]
+        self.shared = []
+        self.iteration = 0
+
+    def share_regrets(self):
+        # Moves the regret tables into shared memory and returns what
+        # init_worker needs to find them.
+        for player, table in enumerate(self.regrets):
+            memory = SharedMemory(create=True, size=table.nbytes)
+            shared = np.ndarray(table.shape, dtype=table.dtype, buffer=memory.buf)
+            shared[...] = table
+            self.regrets[player] = shared
+            self.shared.append(memory)
+        return [(memory.name, table.shape) for memory, table in zip(self.shared, self.regrets)]
+
+    def unshare_regrets(self):
+        for player, memory in enumerate(self.shared):
+            self.regrets[player] = self.regrets[player].copy()
+            memory.close()
+            memory.unlink()
+        self.shared = []
+
+    def apply_deltas(self, deltas):
+        # CFR+: regrets are floored at zero and later iterations weigh more in the average.
+        weight = self.iteration + 1
+        for (player, key), (regret_delta, strategy_delta) in deltas.items():
+            row = self.regrets[player][self.game.row(key)]
+            np.maximum(row + regret_delta, 0, out=row)
+            self.strategy_sums[player][self.game.row(key)] += weight * strategy_delta
+
+    def iterate(self, pool=None):
+        game = self.game
+        reach = [game.probs[0], game.probs[1]]
+        if pool is None:
+            deltas = {}
+            traverse(game, self.regrets, 0, 0, -1, reach, deltas)
+            self.apply_deltas(deltas)
+        else:
+            # The opening bids split the tree into independent subtrees, one per
+            # task. The pool must have been started with init_worker on
+            # share_regrets(), and nothing is applied until every task is
+            # done, since the workers read the tables as they stand.
+            mask = game.legal_mask(-1)
+            sigma = regret_matching(self.regrets[0][0], mask)
+            futures = {}
+            for action in game.actions(-1):
+                child_reach = [reach[0] * sigma[:, action], reach[1]]
+                futures[action] = pool.submit(traverse_subtree, 1, game.history_key(0, action), action, child_reach)
+
+            root_regret = np.zeros(sigma.shape)
+            root_value = np.zeros(len(game.rolls[0]))
+            child_values = {}
+            deltas = {}
+            for action, future in futures.items():
+                values, subtree_deltas = future.result()
+                child_values[action] = values[0]
+                root_value += sigma[:, action] * values[0]
+                merge_deltas(deltas, subtree_deltas)
+            for action, value in child_values.items():
+                root_regret[:, action] = value - root_value
+            merge_deltas(deltas, {(0, 0): (root_regret, reach[0][:, None] * sigma)})
+            self.apply_deltas(deltas)
+        self.iteration += 1
+
+    def average_strategy(self):
+        strategies = []
+        for sums in self.strategy_sums:
+            total = sums.sum(axis=2, keepdims=True)
+            uniform = np.full(sums.shape, 1.0 / sums.shape[2], dtype=np.float32)
+            strategies.append(np.where(total > 0, sums / np.where(total > 0, total, 1), uniform))
+        return strategies
+
+    def exploitability(self):
+        game = self.game
+        strategies = self.average_strategy()
+        total = 0.0
+        for player in (0, 1):
+            reach = [game.probs[0], game.probs[1]]
+            values = best_response(game, strategies, player, 0, 0, -1, reach)
+            total += float(game.probs[player] @ values)
+        return total / 2
+
+    def infosets(self):
+        return sum(table.shape[0] * table.shape[1] for table in self.regrets)
+
+    def memory_per_infoset(self):
+        return sum(t.nbytes for t in self.regrets + self.strategy_sums) / self.infosets()
+
+    def policy(self, player, roll, bids):
+        game = self.game
+        key = 0
+        last = -1
+        for quantity, face_value in bids:
+            last = encode_bid(quantity, face_value)
+            key = game.history_key(key, last)
+        sums = self.strategy_sums[player][game.row(key)][game.roll_index[player][tuple(sorted(roll))]]
+        probs = sums * game.legal_mask(last)
+        if probs.sum() <= 0:
+            probs = game.legal_mask(last)
+        return probs / probs.sum()
+
+    def save(self, path):
+        arrays = {f'regrets{p}': self.regrets[p] for p in (0, 1)}
+        arrays.update({f'strategy{p}': self.strategy_sums[p] for p in (0, 1)})
+        recall = -1 if self.game.recall is None else self.game.recall
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, dice=np.array(self.game.dice), recall=recall, iteration=self.iteration, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            recall = int(data['recall'])
+            solver = cls(tuple(int(d) for d in data['dice']), None if recall < 0 else recall)
+            solver.iteration = int(data['iteration'])
+            for p in (0, 1):
+                solver.regrets[p][...] = data[f'regrets{p}']
+                solver.strategy_sums[p][...] = data[f'strategy{p}']
+        return solver
+
+
+class CFRBot(Bot):
+    # Plays the solved strategy in two-player rounds whose dice counts match
+    # the solver, and falls back to ProbabilityBot everywhere else.
+    name = 'cfr'
+
+    def __init__(self, solver, rng=None):
+        super().__init__(rng)
+        self.solver = solver
+        self.fallback = ProbabilityBot(rng)
+        self.bids = []
+        self.seat = 0
+        self.counts = None
+
+    def choose_action(self, view):
+        me = view['perspective']
+        bid = view['current_bid']
+        # Every round costs someone a die, and bids only go up within one.
+        if view['player_counts'] != self.counts or bid is None or (self.bids and bid_code(bid) <= bid_code(self.bids[-1])):
+            self.bids = []
+            self.seat = 0 if bid is None else 1
+            self.counts = list(view['player_counts'])
+        if bid is not None:
+            self.bids.append(tuple(bid))
+
+        counts = [count for count in view['player_counts'] if count]
+        opponent_count = sum(counts) - view['player_counts'][me]
+        dice = (view['player_counts'][me], opponent_count) if self.seat == 0 else (opponent_count, view['player_counts'][me])
+        if len(counts) != 2 or dice != self.solver.game.dice:
+            return self.fallback.choose_action(view)
+
+        probs = self.solver.policy(self.seat, self.own_dice(view), self.bids)
+        action = int(np.searchsorted(np.cumsum(probs), self.rng.random() * probs.sum()))
+        action = min(action, len(probs) - 1)
+        if action == self.solver.game.challenge_action:
+            return ('challenge',)
+        quantity, face_value = decode_bid(action)
+        self.bids.append((quantity, face_value))
+        return ('bid', quantity, face_value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CFR+ solver for two-player Liar's Dice endgames")
+    parser.add_argument('--dice', type=int, nargs=2, default=[1, 1], help="dice held by the opener and the other player")
+    parser.add_argument('--recall', type=int, default=None, help="remember only the last N bids (default: full history)")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--report-every', type=int, default=10)
+    parser.add_argument('--checkpoint', help="npz file to resume from and save to")
+    args = parser.parse_args(argv)
+
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        solver = CFRSolver.load(args.checkpoint)
+        print(f"Resumed from {args.checkpoint} at iteration {solver.iteration}")
+    else:
+        solver = CFRSolver(tuple(args.dice), args.recall)
+
+    print(f"{solver.infosets()} information sets, {solver.memory_per_infoset():.0f} bytes each "
+          f"({sum(t.nbytes for t in solver.regrets + solver.strategy_sums) / 1e6:.1f} MB)")
+
+    pool = None
+    if args.workers > 1:
+        pool = ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(solver.game.dice, solver.game.recall, solver.share_regrets()))
+    try:
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            solver.iterate(pool)
+            if solver.iteration % args.report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"iteration {solver.iteration:>6}  exploitability {solver.exploitability():.5f}  {elapsed:.1f}s")
+                if args.checkpoint:
+                    solver.save(args.checkpoint)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+            solver.unshare_regrets()
+    if args.checkpoint:
+        solver.save(args.checkpoint)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import time
+import random
+import secrets
+import argparse
+from array import array
+
+FACES = 6
+# Bytes at or above this would favour low faces, so they are skipped.
+FACE_LIMIT = 256 - 256 % FACES
+# Maps a byte to its face, or to 0 when it has to be skipped.
+ROLL_TABLE = bytes(b % FACES + 1 if b < FACE_LIMIT else 0 for b in range(256))
+
+
+class BufferedRNG:
+    # Rolls dice from a block of random bytes, refilled when it runs out.
+    # Each byte below FACE_LIMIT gives one face, so every face is exactly
+    # as likely as with randint(1, 6).
+    def __init__(self, seed=None, block_size=4096):
+        self.block_size = block_size
+        self.source = random.Random(seed)
+        self.buffer = b''
+        self.pos = 0
+
+    def fill(self):
+        return self.source.randbytes(self.block_size)
+
+    def take(self, n):
+        if self.pos + n > len(self.buffer):
+            self.buffer = self.buffer[self.pos:] + self.fill()
+            self.pos = 0
+        data = self.buffer[self.pos:self.pos + n]
+        self.pos += n
+        return data
+
+    def roll(self, n):
+        faces = self.take(n).translate(ROLL_TABLE)
+        if 0 in faces:
+            faces = faces.replace(b'\0', b'')
+            while len(faces) < n:
+                faces += self.take(n - len(faces)).translate(ROLL_TABLE).replace(b'\0', b'')
+        return faces
+
+    def randint(self, a, b):
+        span = b - a + 1
+        if span <= 256:
+            limit = 256 - 256 % span
+            while True:
+                byte = self.take(1)[0]
+                if byte < limit:
+                    return a + byte % span
+        return a + int.from_bytes(self.take(8), 'little') % span
+
+    def random(self):
+        return (int.from_bytes(self.take(7), 'little') >> 3) / (1 << 53)
+
+
+class SecureRNG(BufferedRNG):
+    # Same bulk path, fed from the operating system's CSPRNG. It cannot be
+    # seeded, which is the point.
+    def __init__(self, block_size=4096):
+        super().__init__(None, block_size)
+        self.source = None
+
+    def fill(self):
+        return secrets.token_bytes(self.block_size)
+
+
+class NumpyRNG:
+    # Pre-draws a block of faces with a NumPy Generator and hands out slices.
+    def __init__(self, seed=None, block_size=4096):
+        import numpy as np
+
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        self.buffer = b''
+        self.pos = 0
+
+    def roll(self, n):
+        if self.pos + n > len(self.buffer):
+            faces = self.generator.integers(1, FACES + 1, size=max(self.block_size, n), dtype='u1')
+            self.buffer = self.buffer[self.pos:] + faces.tobytes()
+            self.pos = 0
+        faces = self.buffer[self.pos:self.pos + n]
+        self.pos += n
+        return faces
+
+    def randint(self, a, b):
+        return int(self.generator.integers(a, b + 1))
+
+    def random(self):
+        return float(self.generator.random())
+
+
+RNGS = {
+    'python': lambda seed: random.Random(seed),
+    'bytes': BufferedRNG,
+    'numpy': NumpyRNG,
+    'secure': lambda seed: SecureRNG(),
+}
+
+
+def make_rng(kind='bytes', seed=None):
+    return RNGS[kind](seed)
+
+
+def roll_faces(rng, n):
+    # Bulk RNGs roll in one call; anything else with randint goes die by die.
+    roll = getattr(rng, 'roll', None)
+    if roll is not None:
+        return array('B', roll(n))
+    randint = rng.randint
+    return array('B', [randint(1, FACES) for _ in range(n)])
+
+
+def chi_square(faces):
+    counts = [faces.count(face) for face in range(1, FACES + 1)]
+    expected = len(faces) / FACES
+    return sum((c - expected) ** 2 / expected for c in counts), counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and time the dice RNGs")
+    parser.add_argument('--rolls', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=5, help="dice per roll call, as in one DiceSet")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # 11.07 is the 95% point of chi-square with 5 degrees of freedom.
+    print(f"{'rng':<8} {'rolls/sec':>12} {'chi-square':>11}  (uniform below 11.07 at 95%)")
+    for kind in RNGS:
+        rng = make_rng(kind, args.seed)
+        faces = array('B')
+        start = time.perf_counter()
+        for _ in range(args.rolls // args.batch):
+            faces += roll_faces(rng, args.batch)
+        elapsed = time.perf_counter() - start
+        stat, _ = chi_square(faces)
+        print(f"{kind:<8} {len(faces) / elapsed:>12,.0f} {stat:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import time
+import random
+import argparse
+from collections import OrderedDict
+
+import numpy as np
+
+from bots import Bot, ProbabilityBot, make_bot
+from bids import bid_code, decode_bid
+from cfr import EndgameGame
+from probability import FACES, tail_table, matching_counts
+
+POSITION = 0
+ROUND = 1
+# Dice counts are packed into four bits each.
+MAX_COUNT = 15
+# Values closer than this are a tie, so rounding never picks between equal
+# moves and the two sides of a mirrored game choose alike.
+TIE = 1e-9
+
+
+class TranspositionTable:
+    # Bounded LRU map from packed state keys to solved values.
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def state_key(kind, mine, theirs, hand=()):
+    # The sorted hand packs into base-7 digits, then the two dice counts
+    # (four bits each) and the entry kind.
+    assert mine <= MAX_COUNT and theirs <= MAX_COUNT, "dice counts do not fit the key"
+    code = 0
+    for value in sorted(hand):
+        code = code * 7 + value
+    return (((code << 4 | mine) << 4 | theirs) << 1) | kind
+
+
+class EndgameSolver:
+    # Search of a two-player endgame. Both players choose with their own dice
+    # only, weighing the other's possible hands by how likely each is to be
+    # rolled; bids are not read as a sign of what the bidder holds. Each
+    # round is swept from the top bid down over every pair of hands at once,
+    # so values are exact expectations for that pair of strategies, though
+    # not an equilibrium. Each new round starts with either player at even
+    # odds as start_new_round does. Within a round only the current bid
+    # matters, so every position is searched for all bids at once.
+    def __init__(self, max_entries=200000, max_dice=10):
+        # Either count can reach max_dice - 1 before the other runs out.
+        if max_dice - 1 > MAX_COUNT:
+            raise ValueError(f"endgames of more than {MAX_COUNT + 1} dice are not supported")
+        self.table = TranspositionTable(max_entries)
+        self.max_dice = max_dice
+        self.nodes = 0
+
+    def solvable(self, view):
+        counts = [count for count in view['player_counts'] if count]
+        return len(counts) == 2 and sum(counts) <= self.max_dice
+
+    def round_value(self, mine, theirs):
+        # Value of the game from the start of a round, before the roll.
+        if mine == 0:
+            return 0.0
+        if theirs == 0:
+            return 1.0
+        value = self.table.get(state_key(ROUND, mine, theirs))
+        if value is None:
+            value = self.solve(mine, theirs)[0]
+        return value
+
+    def position(self, hand, theirs):
+        # answering[i]: our value once the opponent must answer a bid of
+        # rank i - 1 (0: they open), over the hands they may hold.
+        value = self.table.get(state_key(POSITION, len(hand), theirs, hand))
+        if value is None:
+            # A small table may already have evicted it again.
+            value = self.solve(len(hand), theirs)[1][tuple(sorted(hand))]
+        return value
+
+    def solve(self, mine, theirs):
+        # Stores and returns the round value and every hand's position for
+        # these counts.
+        lose = self.round_value(mine - 1, theirs)
+        win = self.round_value(mine, theirs - 1)
+
+        game = EndgameGame((mine, theirs))
+        ours, others = game.probs
+        # Rows are our hands, columns theirs. The best raise each of our
+        # hands can make above the bid being swept, and each of theirs.
+        our_score = np.full(len(ours), -np.inf)
+        our_raise = np.zeros((len(ours), len(others)))
+        their_score = np.full(len(others), np.inf)
+        their_raise = np.zeros((len(ours), len(others)))
+        answering = np.empty((game.num_bids + 1, len(ours)))
+        for i in range(game.num_bids, -1, -1):
+            if i:
+                # facing: we must answer their bid i; answered: they must answer ours.
+                truth = game.truth[i - 1]
+                facing = np.where(truth, lose, win)
+                answered = np.where(truth, win, lose)
+                facing = np.where((our_score > facing @ others + TIE)[:, None], our_raise, facing)
+                answered = np.where((their_score < ours @ answered - TIE)[None, :], their_raise, answered)
+            else:
+                facing = our_raise
+                answered = their_raise
+            answering[i] = answered @ others
+
+            # Ties go to the lower bid, which gives away the least, and
+            # challenging wins ties with raising.
+            better = answering[i] >= our_score - TIE
+            our_score = np.where(better, answering[i], our_score)
+            our_raise = np.where(better[:, None], answered, our_raise)
+            score = ours @ facing
+            better = score <= their_score + TIE
+            their_score = np.where(better, score, their_score)
+            their_raise = np.where(better[None, :], facing, their_raise)
+        self.nodes += 2 * (game.num_bids + 1) * len(ours) * len(others)
+
+        positions = {hand: values.tolist() for hand, values in zip(game.rolls[0], answering.T)}
+        for hand, values in positions.items():
+            self.table.store(state_key(POSITION, mine, theirs, hand), values)
+        value = 0.5 * float(ours @ (facing + answered) @ others)
+        self.table.store(state_key(ROUND, mine, theirs), value)
+        return value, positions
+
+    def action_values(self, hand, theirs, current_bid=None):
+        # Value of every move available to us at this point.
+        answering = self.position(tuple(hand), theirs)
+
+        first = bid_code(current_bid) + 1
+        values = {}
+        if current_bid is not None:
+            quantity, face_value = current_bid
+            needed = min(max(quantity - matching_counts(hand)[face_value], 0), theirs + 1)
+            p = tail_table()[int(face_value == 1), theirs, needed]
+            values[('challenge',)] = p * self.round_value(len(hand) - 1, theirs) + (1 - p) * self.round_value(len(hand), theirs - 1)
+        for rank in range(first, len(answering) - 1):
+            values[('bid',) + decode_bid(rank)] = answering[rank + 1]
+        return values
+
+    def best_action(self, view):
+        me = view['perspective']
+        theirs = sum(view['player_counts']) - view['player_counts'][me]
+        values = self.action_values(view['dice'][me], theirs, view['current_bid'])
+        action = max(values, key=values.get)
+        return action, values[action]
+
+
+class EndgameBot(Bot):
+    name = 'endgame'
+
+    def __init__(self, rng=None, solver=None):
+        super().__init__(rng)
+        self.solver = solver or EndgameSolver()
+        self.fallback = ProbabilityBot(rng)
+
+    def choose_action(self, view):
+        if not self.solver.solvable(view):
+            return self.fallback.choose_action(view)
+        return self.solver.best_action(view)[0]
+
+
+def main(argv=None):
+    from tournament import play_game
+
+    parser = argparse.ArgumentParser(description="Heuristic endgame search for two-player Liar's Dice")
+    parser.add_argument('--dice', type=int, default=3, help="dice per player")
+    parser.add_argument('--games', type=int, default=500, help="games against ProbabilityBot")
+    parser.add_argument('--max-entries', type=int, default=200000, help="transposition table size")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    solver = EndgameSolver(args.max_entries, max_dice=2 * args.dice)
+    start = time.perf_counter()
+    value = solver.round_value(args.dice, args.dice)
+    elapsed = time.perf_counter() - start
+    print(f"{args.dice}v{args.dice} round start: value {value:.4f}, searched in {elapsed:.2f}s "
+          f"({solver.nodes:,} nodes, {solver.nodes / elapsed:,.0f} nodes/sec)")
+
+    rng = random.Random(args.seed)
+    wins = 0
+    solved_nodes = solver.nodes
+    start = time.perf_counter()
+    for i in range(args.games):
+        bots = [EndgameBot(random.Random(f"{args.seed}:{i}"), solver), make_bot('probability', random.Random(f"{args.seed}:{i}:p"))]
+        seat = i % 2
+        if seat:
+            bots.reverse()
+        wins += play_game(bots, rng, args.dice) == seat
+    elapsed = time.perf_counter() - start
+
+    table = solver.table
+    print(f"Endgame bot won {wins}/{args.games} games against ProbabilityBot in {elapsed:.2f}s")
+    print(f"Table: {len(table.entries):,} entries, hit rate {table.hit_rate():.3f}, {table.evictions:,} evictions, "
+          f"{solver.nodes - solved_nodes:,} nodes searched again during play")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+import random
+from array import array
+
+from dicerng import BufferedRNG, roll_faces
+from bids import BID_CODES, NO_BID, MAX_DICE
+
+NO_COUNTS = array('H', bytes(14))
+MIN_PLAYERS = 2
+MAX_PLAYERS = 8
+
+class Die:
+    __slots__ = ('value', 'held', 'rng')
+    
+    def __init__(self, rng=None):
+        self.rng = rng or random
+        self.value = self.rng.randint(1, 6)
+        self.held = False
+    
+    def roll(self):
+        if not self.held:
+            self.value = self.rng.randint(1, 6)
+
+class DiceSet:
+    __slots__ = ('values', 'held', 'counts', 'rng')
+    
+    def __init__(self, num_dice=5, rng=None):
+        self.rng = rng or random
+        self.values = roll_faces(self.rng, num_dice)
+        self.held = array('B', bytes(num_dice))
+        self.counts = array('H', bytes(14))
+        self.recount()
+    
+    @classmethod
+    def from_values(cls, values, held=None, rng=None):
+        # A set holding exactly these dice, without rolling any.
+        dice = cls.__new__(cls)
+        dice.rng = rng or random
+        dice.values = array('B', values)
+        dice.held = array('B', held if held is not None else bytes(len(dice.values)))
+        dice.counts = array('H', bytes(14))
+        dice.recount()
+        return dice
+    
+    def reset(self, num_dice=5):
+        # Back to num_dice fresh dice in the same arrays, rolled exactly as
+        # __init__ would roll them.
+        values = self.values
+        del values[num_dice:]
+        values.extend(bytes(num_dice - len(values)))
+        held = self.held
+        del held[:]
+        held.extend(bytes(num_dice))
+        self.roll_all()
+    
+    def recount(self):
+        counts = self.counts
+        counts[:] = NO_COUNTS
+        for value in self.values:
+            counts[value] += 1
+    
+    def roll_all(self):
+        values = self.values
+        held = self.held
+        roll = getattr(self.rng, 'roll', None)
+        if roll is None:
+            randint = self.rng.randint
+            for i in range(len(values)):
+                if not held[i]:
+                    values[i] = randint(1, 6)
+        elif not any(held):
+            values[:] = array('B', roll(len(values)))
+        else:
+            faces = iter(roll(len(values) - sum(held)))
+            for i in range(len(values)):
+                if not held[i]:
+                    values[i] = next(faces)
+        self.recount()
+    
+    def set_values(self, values):
+        self.values[:] = array('B', values)
+        del self.held[len(self.values):]
+        self.held.extend(bytes(len(self.values) - len(self.held)))
+        self.recount()
+    
+    def hold(self, index, held=True):
+        self.held[index] = held
+    
+    def get_values(self):
+        return list(self.values)
+    
+    def count_value(self, value):
+        if 0 <= value < len(self.counts):
+            return self.counts[value]
+        return 0
+    
+    def count_matching(self, value):
+        if value == 1:
+            return self.counts[1]
+        return self.counts[value] + self.counts[1]
+    
+    def remove_die(self):
+        if self.values:
+            self.held.pop()
+            value = self.values.pop()
+            self.counts[value] -= 1
+            return value
+        return None
+    
+    def size(self):
+        return len(self.values)
+
+STATE_FIELDS = ('current_player', 'current_bid', 'player_counts', 'message', 'round_active', 'game_over', 'winner', 'all_dice_revealed', 'challenge_result')
+
+class LiarsDiceGame:
+    def __init__(self, num_players=2, num_dice=5, rng=None, log=None, seed=None):
+        if rng is None and seed is not None:
+            rng = BufferedRNG(seed)
+        self.rng = rng or random
+        self.log = log
+        self.players = []
+        self.dice_counts = array('B')
+        # reset() bumps every version, which brings a new game to 0.
+        self.version = -1
+        self.field_versions = dict.fromkeys(STATE_FIELDS, -1)
+        self.dice_versions = []
+        self.reset(num_players, num_dice)
+    
+    @classmethod
+    def from_state(cls, num_dice, players, current_player, current_bid=None, last_bidder=None, round_active=True,
+                   message="", game_over=False, winner=None, all_dice_revealed=False, challenge_result="",
+                   version=0, rng=None):
+        # A game picked up in the middle of play, with players holding each
+        # seat's DiceSet. Nothing is rolled and nothing is logged. Every field
+        # counts as changed at version, so followers start from a full view.
+        num_players = len(players)
+        if not MIN_PLAYERS <= num_players <= MAX_PLAYERS:
+            raise ValueError(f"a game needs {MIN_PLAYERS} to {MAX_PLAYERS} players, not {num_players}")
+        game = cls.__new__(cls)
+        game.rng = rng or random
+        game.log = None
+        game.num_players = num_players
+        game.num_dice = num_dice
+        game.players = list(players)
+        game.dice_counts = array('B', [player.size() for player in players])
+        game.current_player = current_player
+        game.last_bidder = last_bidder
+        game.current_bid = current_bid
+        game.round_active = round_active
+        game.message = message
+        game.game_over = game_over
+        game.winner = winner
+        game.all_dice_revealed = all_dice_revealed
+        game.challenge_result = challenge_result
+        game.version = version
+        game.field_versions = dict.fromkeys(STATE_FIELDS, version)
+        game.dice_versions = [version] * num_players
+        return game
+    
+    def reset(self, num_players=None, num_dice=None):
+        # Starts a new game on this object, reusing its dice sets and tables
+        # rather than building new ones. Versions keep counting up, so anyone
+        # following the old game sees every field change.
+        if num_players is None:
+            num_players = self.num_players
+        if num_dice is None:
+            num_dice = self.num_dice
+        if not MIN_PLAYERS <= num_players <= MAX_PLAYERS:
+            raise ValueError(f"a game needs {MIN_PLAYERS} to {MAX_PLAYERS} players, not {num_players}")
+        if num_players * num_dice > MAX_DICE:
+            raise ValueError(f"at most {MAX_DICE} dice can be in play, not {num_players * num_dice}")
+        self.num_players = num_players
+        self.num_dice = num_dice
+        
+        players = self.players
+        del players[num_players:]
+        for player in players:
+            player.reset(num_dice)
+        while len(players) < num_players:
+            players.append(DiceSet(num_dice, self.rng))
+        
+        counts = self.dice_counts
+        del counts[num_players:]
+        counts.extend(bytes(num_players - len(counts)))
+        for i in range(num_players):
+            counts[i] = num_dice
+        
+        self.current_player = 0
+        self.last_bidder = None
+        self.current_bid = None
+        self.round_active = True
+        self.message = ""
+        self.game_over = False
+        self.winner = None
+        self.all_dice_revealed = False
+        self.challenge_result = ""
+        
+        versions = self.dice_versions
+        del versions[num_players:]
+        versions.extend([0] * (num_players - len(versions)))
+        self.bump(STATE_FIELDS, range(num_players))
+        
+        if self.log:
+            self.log.log_new_game(self)
+    
+    def roll_all_dice(self):
+        for player in self.players:
+            player.roll_all()
+        self.all_dice_revealed = False
+        self.challenge_result = ""
+        self.bump(('all_dice_revealed', 'challenge_result'), range(self.num_players))
+        
+        if self.log:
+            self.log.log_rolls(self)
+    
+    def bump(self, fields, changed_players=()):
+        self.version += 1
+        for field in fields:
+            self.field_versions[field] = self.version
+        for player in changed_players:
+            self.dice_versions[player] = self.version
+    
+    def active_players(self):
+        return [i for i, count in enumerate(self.dice_counts) if count]
+    
+    def next_player(self, player):
+        for step in range(1, self.num_players + 1):
+            candidate = (player + step) % self.num_players
+            if self.dice_counts[candidate]:
+                return candidate
+        return player
+    
+    def total_dice(self):
+        return sum(self.dice_counts)
+    
+    def make_bid(self, player, quantity, face_value):
+        if player != self.current_player or not self.round_active:
+            return False
+        
+        code = BID_CODES.get((quantity, face_value))
+        current = BID_CODES[self.current_bid] if self.current_bid else NO_BID
+        if code is None or code <= current or quantity > sum(self.dice_counts):
+            return False
+        
+        self.current_bid = (quantity, face_value)
+        self.last_bidder = player
+        self.current_player = self.next_player(player)
+        self.message = f"Player {self.current_player + 1}'s turn"
+        self.challenge_result = ""
+        self.bump(('current_bid', 'current_player', 'message', 'challenge_result'))
+        
+        if self.log:
+            self.log.log_bid(self, player, quantity, face_value)
+        return True
+    
+    def challenge(self, player):
+        if player != self.current_player or not self.round_active or not self.current_bid:
+            return False
+        
+        self.all_dice_revealed = True
+        
+        total_count = 0
+        for p in self.players:
+            total_count += p.count_matching(self.current_bid[1])
+        
+        bid_quantity, bid_value = self.current_bid
+        
+        if total_count >= bid_quantity:
+            loser = player
+            self.challenge_result = f"Challenge failed! Total {total_count} {bid_value}s"
+            self.message = f"Player {loser + 1} loses a die"
+        else:
+            loser = self.last_bidder
+            self.challenge_result = f"Challenge succeeded! Only {total_count} {bid_value}s"
+            self.message = f"Player {loser + 1} loses a die"
+        
+        self.players[loser].remove_die()
+        self.dice_counts[loser] -= 1
+        
+        self.current_bid = None
+        self.last_bidder = None
+        self.round_active = False
+        
+        if self.dice_counts[loser] == 0:
+            remaining = self.active_players()
+            if len(remaining) == 1:
+                winner = remaining[0]
+                self.winner = winner
+                self.game_over = True
+                self.message = f"Player {winner + 1} wins!"
+                self.challenge_result = ""
+            else:
+                self.message = f"Player {loser + 1} is out of dice"
+        
+        self.bump(('current_bid', 'player_counts', 'message', 'round_active', 'game_over', 'winner', 'all_dice_revealed', 'challenge_result'), (loser,))
+        
+        if self.log:
+            self.log.log_challenge(self, player, loser, total_count)
+        return True
+    
+    def start_new_round(self):
+        if self.game_over:
+            self.reset()
+        else:
+            self.roll_all_dice()
+            active = self.active_players()
+            self.current_player = active[self.rng.randint(0, len(active) - 1)]
+            self.current_bid = None
+            self.last_bidder = None
+            self.round_active = True
+            self.all_dice_revealed = False
+            self.message = f"Player {self.current_player + 1}'s turn"
+            self.challenge_result = ""
+            self.bump(('current_player', 'current_bid', 'round_active', 'all_dice_revealed', 'message', 'challenge_result'))
+            
+            if self.log:
+                self.log.log_round(self)
+    
+    def get_player_view(self, player_perspective):
+        state = {
+            'num_players': self.num_players,
+            'current_player': self.current_player,
+            'current_bid': self.current_bid,
+            'player_counts': list(self.dice_counts),
+            'message': self.message,
+            'round_active': self.round_active,
+            'game_over': self.game_over,
+            'winner': self.winner,
+            'all_dice_revealed': self.all_dice_revealed,
+            'challenge_result': self.challenge_result
+        }
+        
+        revealed = self.all_dice_revealed or self.game_over
+        dice = [p.get_values() for p in self.players]
+        visible_dice = []
+        for i, values in enumerate(dice):
+            if revealed or i == player_perspective:
+                visible_dice.append(values)
+            else:
+                visible_dice.append(['?'] * len(values))
+        
+        state['dice'] = dice
+        state['visible_dice'] = visible_dice
+        
+        for i in range(self.num_players):
+            state[f'player{i + 1}_dice'] = dice[i]
+            state[f'player{i + 1}_count'] = self.dice_counts[i]
+            state[f'visible_player{i + 1}_dice'] = visible_dice[i]
+        
+        state['perspective'] = player_perspective
+        
+        return state
+    
+    def get_view_diff(self, player_perspective, since_version=-1):
+        # Only what changed after since_version, as seen from player_perspective
+        # (None for a spectator). The default returns the whole public view.
+        changes = {}
+        for field in STATE_FIELDS:
+            if self.field_versions[field] > since_version:
+                if field == 'player_counts':
+                    changes[field] = list(self.dice_counts)
+                else:
+                    changes[field] = getattr(self, field)
+        if since_version < 0:
+            changes['num_players'] = self.num_players
+            changes['perspective'] = player_perspective
+        
+        revealed = self.all_dice_revealed or self.game_over
+        reveal_version = max(self.field_versions['all_dice_revealed'], self.field_versions['game_over'])
+        visible_dice = []
+        for i, player in enumerate(self.players):
+            if self.dice_versions[i] > since_version or reveal_version > since_version:
+                values = player.get_values()
+                if not (revealed or i == player_perspective):
+                    values = ['?'] * len(values)
+                visible_dice.append([i, values])
+        if visible_dice:
+            changes['visible_dice'] = visible_dice
+        
+        return self.version, changes
+
+
+class Pool:
+    # A free list for objects with a reset() method, such as LiarsDiceGame or
+    # DiceSet: acquire() hands back a released one reset with the given
+    # arguments, and only builds a new one when none is free.
+    def __init__(self, factory, max_free=1024):
+        self.factory = factory
+        self.max_free = max_free
+        self.free = []
+        self.created = 0
+        self.reused = 0
+    
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.reused += 1
+            return obj
+        self.created += 1
+        return self.factory(*args)
+    
+    def release(self, obj):
+        if len(self.free) < self.max_free:
+            self.free.append(obj)
+
+class GamePool(Pool):
+    def __init__(self, rng=None, log=None, max_free=1024):
+        super().__init__(lambda num_players=2, num_dice=5: LiarsDiceGame(num_players, num_dice, rng, log), max_free)
@@ -0,0 +1,322 @@
+import os
+import sys
+import mmap
+import time
+import random
+import struct
+import argparse
+import tempfile
+import numpy as np
+
+from engine import LiarsDiceGame
+
+# Every event is one fixed-size little-endian record:
+# game id, event sequence number within the game, kind, player, two small
+# operands and up to MAX_DICE dice values.
+MAX_DICE = 8
+RECORD = struct.Struct(f'<IIBBBB{MAX_DICE}s')
+RECORD_DTYPE = np.dtype([
+    ('game', '<u4'),
+    ('seq', '<u4'),
+    ('kind', 'u1'),
+    ('player', 'u1'),
+    ('a', 'u1'),
+    ('b', 'u1'),
+    ('dice', 'u1', (MAX_DICE,)),
+])
+NONE = 255
+
+NEW_GAME = 1     # a = players, b = dice per player
+ROLL = 2         # player's dice, a = count
+ROUND = 3        # player = starting player
+BID = 4          # a = quantity, b = face
+CHALLENGE = 5    # player = challenger, a = loser, b = matching dice
+GAME_OVER = 6    # player = winner
+CHECKPOINT = 7   # player = current, a/b = bid, dice = last bidder, flags, winner
+SNAPSHOT = 8     # player's dice as part of the preceding checkpoint
+
+ROUND_ACTIVE = 1
+GAME_OVER_FLAG = 2
+REVEALED = 4
+
+
+class GameLog:
+    def __init__(self, path, checkpoint_every=64, buffer_size=1 << 16):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.next_game_id = self.last_game_id(path) + 1
+        self.file = open(path, 'ab')
+
+    @staticmethod
+    def last_game_id(path):
+        if not os.path.exists(path) or os.path.getsize(path) < RECORD.size:
+            return 0
+        with LogReader(path) as reader:
+            return int(reader.records['game'].max())
+
+    def write(self, game, kind, player=0, a=0, b=0, dice=b'', advance=True):
+        self.buffer += RECORD.pack(game.game_id, game.log_seq, kind, player, a, b, dice)
+        if advance:
+            game.log_seq += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_dice(self, game, kind):
+        for i, player in enumerate(game.players):
+            self.write(game, kind, i, player.size(), 0, player.values.tobytes(), advance=kind != SNAPSHOT)
+
+    def write_checkpoint(self, game):
+        flags = (ROUND_ACTIVE if game.round_active else 0) | (GAME_OVER_FLAG if game.game_over else 0) | (REVEALED if game.all_dice_revealed else 0)
+        q, v = game.current_bid or (0, 0)
+        last_bidder = NONE if game.last_bidder is None else game.last_bidder
+        winner = NONE if game.winner is None else game.winner
+        self.write(game, CHECKPOINT, game.current_player, q, v, bytes((last_bidder, flags, winner)), advance=False)
+        self.write_dice(game, SNAPSHOT)
+        game.log_checkpoint = game.log_seq
+
+    def maybe_checkpoint(self, game):
+        if game.log_seq - game.log_checkpoint >= self.checkpoint_every:
+            self.write_checkpoint(game)
+
+    def log_new_game(self, game):
+        # struct would silently cut a longer roll short.
+        if game.num_dice > MAX_DICE:
+            raise ValueError(f"the game log holds at most {MAX_DICE} dice per player, not {game.num_dice}")
+        game.game_id = self.next_game_id
+        game.log_seq = 0
+        game.log_checkpoint = 0
+        self.next_game_id += 1
+        self.write(game, NEW_GAME, 0, game.num_players, game.num_dice)
+        self.write_dice(game, ROLL)
+
+    def log_rolls(self, game):
+        self.write_dice(game, ROLL)
+
+    def log_round(self, game):
+        self.write(game, ROUND, game.current_player)
+        self.maybe_checkpoint(game)
+
+    def log_bid(self, game, player, quantity, face_value):
+        self.write(game, BID, player, quantity, face_value)
+        self.maybe_checkpoint(game)
+
+    def log_challenge(self, game, player, loser, total_count):
+        self.write(game, CHALLENGE, player, loser, total_count)
+        if game.game_over:
+            self.write(game, GAME_OVER, game.winner)
+        self.maybe_checkpoint(game)
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LogReader:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        count = os.fstat(self.file.fileno()).st_size // RECORD.size
+        self.mm = None
+        if count:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.records = np.frombuffer(self.mm, dtype=RECORD_DTYPE, count=count)
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self.order = None
+
+    def close(self):
+        self.records = None
+        self.order = None
+        if self.mm is not None:
+            self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def build_index(self):
+        # Games can interleave when many tables share one log, so group each
+        # game's records together while keeping their order in the file.
+        games = self.records['game']
+        self.order = np.argsort(games, kind='stable')
+        self.game_ids, starts = np.unique(games[self.order], return_index=True)
+        self.game_bounds = np.append(starts, len(games))
+
+    def game_records(self, game_id):
+        if self.order is None:
+            self.build_index()
+        i = np.searchsorted(self.game_ids, game_id)
+        if i == len(self.game_ids) or self.game_ids[i] != game_id:
+            raise KeyError(game_id)
+        return self.records[self.order[self.game_bounds[i]:self.game_bounds[i + 1]]]
+
+    def replay(self, game_id, seq=None):
+        # Rebuild the game as it stood before event `seq` (the end if None),
+        # starting from the closest earlier checkpoint.
+        records = self.game_records(game_id)
+        first = records[0]
+        game = LiarsDiceGame(int(first['a']), int(first['b']))
+        if seq is None:
+            seq = int(records['seq'].max()) + 1
+
+        kinds = records['kind']
+        checkpoints = np.nonzero(kinds == CHECKPOINT)[0]
+        k = np.searchsorted(records['seq'][checkpoints], seq, side='right') - 1
+        if k >= 0:
+            start = checkpoints[k]
+            restore_checkpoint(game, records, start)
+            position = start + 1 + game.num_players
+        else:
+            position = 1
+
+        for record in records[position:]:
+            if record['seq'] >= seq:
+                break
+            apply_record(game, record)
+        return game
+
+    def summary(self):
+        records = self.records
+        kinds = records['kind']
+        bids = records[kinds == BID]
+        challenges = records[kinds == CHALLENGE]
+        finished = records[kinds == GAME_OVER]
+        return {
+            'games': int((kinds == NEW_GAME).sum()),
+            'rounds': int((kinds == ROUND).sum()),
+            'bids': len(bids),
+            'challenges': len(challenges),
+            'challenge_success_rate': float((challenges['a'] != challenges['player']).mean()) if len(challenges) else 0.0,
+            'mean_bid_quantity': float(bids['a'].mean()) if len(bids) else 0.0,
+            'bids_by_face': np.bincount(bids['b'], minlength=7)[1:].tolist(),
+            'wins_by_seat': np.bincount(finished['player'], minlength=2).tolist(),
+        }
+
+
+def set_player_dice(game, record):
+    player = int(record['player'])
+    count = int(record['a'])
+    game.players[player].set_values(record['dice'][:count].tobytes())
+    game.dice_counts[player] = count
+
+
+def restore_checkpoint(game, records, start):
+    checkpoint = records[start]
+    last_bidder, flags, winner = (int(x) for x in checkpoint['dice'][:3])
+    game.current_player = int(checkpoint['player'])
+    game.current_bid = (int(checkpoint['a']), int(checkpoint['b'])) if checkpoint['b'] else None
+    game.last_bidder = None if last_bidder == NONE else last_bidder
+    game.winner = None if winner == NONE else winner
+    game.round_active = bool(flags & ROUND_ACTIVE)
+    game.game_over = bool(flags & GAME_OVER_FLAG)
+    game.all_dice_revealed = bool(flags & REVEALED)
+    game.message = f"Player {game.current_player + 1}'s turn"
+    for record in records[start + 1:start + 1 + game.num_players]:
+        set_player_dice(game, record)
+
+
+def apply_record(game, record):
+    kind = record['kind']
+    player = int(record['player'])
+    if kind == ROLL:
+        set_player_dice(game, record)
+        game.all_dice_revealed = False
+        game.challenge_result = ""
+    elif kind == ROUND:
+        game.current_player = player
+        game.current_bid = None
+        game.last_bidder = None
+        game.round_active = True
+        game.all_dice_revealed = False
+        game.message = f"Player {player + 1}'s turn"
+        game.challenge_result = ""
+    elif kind == BID:
+        game.make_bid(player, int(record['a']), int(record['b']))
+    elif kind == CHALLENGE:
+        game.challenge(player)
+
+
+def game_state(game):
+    return (game.current_player, game.current_bid, tuple(game.dice_counts), tuple(tuple(p.values) for p in game.players),
+            game.round_active, game.game_over, game.winner)
+
+
+def simulate(path, num_games, num_players=2, checkpoint_every=64, seed=0, sample_prob=0.01):
+    from bots import make_bot
+
+    rng = random.Random(seed)
+    bots = [make_bot('probability', random.Random(seed + i)) for i in range(num_players)]
+    samples = []
+    with GameLog(path, checkpoint_every) as log:
+        game = LiarsDiceGame(num_players, rng=rng, log=log)
+        for _ in range(num_games):
+            game.start_new_round()
+            while not game.game_over:
+                if not game.round_active:
+                    game.start_new_round()
+                player = game.current_player
+                action = bots[player].choose_action(game.get_player_view(player))
+                if action[0] == 'challenge' or not game.make_bid(player, action[1], action[2]):
+                    if not game.challenge(player):
+                        game.make_bid(player, 1, 2)
+                if rng.random() < sample_prob:
+                    samples.append((game.game_id, game.log_seq, game_state(game)))
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write, scan and seek a binary Liar's Dice event log")
+    parser.add_argument('--games', type=int, default=5000)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--checkpoint-every', type=int, default=64)
+    parser.add_argument('--path', help="log file to use (default: a temporary file)")
+    args = parser.parse_args(argv)
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'games.log')
+    start = time.perf_counter()
+    samples = simulate(path, args.games, args.players, args.checkpoint_every)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    print(f"Played and logged {args.games} games in {elapsed:.2f}s: {size // RECORD.size} records, {size / 1e6:.1f} MB")
+
+    with LogReader(path) as reader:
+        start = time.perf_counter()
+        summary = reader.summary()
+        elapsed = time.perf_counter() - start
+        print(f"Scanned {len(reader.records)} records in {elapsed * 1000:.1f} ms ({len(reader.records) / max(elapsed, 1e-9) / 1e6:.0f}M records/sec)")
+        for key, value in summary.items():
+            print(f"  {key}: {value}")
+
+        start = time.perf_counter()
+        reader.build_index()
+        index_time = time.perf_counter() - start
+
+        mismatches = 0
+        start = time.perf_counter()
+        for game_id, seq, expected in samples:
+            if game_state(reader.replay(game_id, seq)) != expected:
+                mismatches += 1
+        elapsed = time.perf_counter() - start
+        print(f"Indexed games in {index_time * 1000:.1f} ms; {len(samples)} random seeks took "
+              f"{elapsed / max(len(samples), 1) * 1e6:.0f} us each, {mismatches} mismatches")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import time
+import random
+import asyncio
+import argparse
+
+from server import GameServer, encode, read_message
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def pick_action(state, rng):
+    bid = state['current_bid']
+    total_dice = sum(state['player_counts'])
+    if bid is None:
+        return {'type': 'bid', 'quantity': 1, 'face': rng.randint(1, 6)}
+
+    q, v = bid
+    if q >= total_dice or rng.random() < 0.3:
+        return {'type': 'challenge'}
+    if v < 6 and rng.random() < 0.5:
+        return {'type': 'bid', 'quantity': q, 'face': rng.randint(v + 1, 6)}
+    return {'type': 'bid', 'quantity': q + 1, 'face': rng.randint(1, 6)}
+
+
+def apply_delta(state, changes):
+    visible_dice = state.setdefault('visible_dice', {})
+    for i, values in changes.pop('visible_dice', ()):
+        visible_dice[i] = values
+    state.update(changes)
+
+
+async def run_client(host, port, actions, think, latencies, ready, go, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({'type': 'join'}))
+    seat = None
+    sent_at = None
+    state = {}
+    ready.release()
+    await go.wait()
+
+    try:
+        while actions > 0:
+            message = await read_message(reader)
+            if message['type'] == 'joined':
+                seat = message['seat']
+            elif message['type'] == 'closed':
+                break
+            elif message['type'] in ('delta', 'error'):
+                if sent_at is not None:
+                    latencies.append((time.perf_counter() - sent_at) * 1000)
+                    sent_at = None
+                    actions -= 1
+
+                if message['type'] == 'delta':
+                    apply_delta(state, message['changes'])
+                if state.get('round_active') and state.get('current_player') == seat:
+                    if think:
+                        await asyncio.sleep(rng.uniform(0, think) / 1000)
+                    writer.write(encode(pick_action(state, rng)))
+                    sent_at = time.perf_counter()
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients, actions, think, seed):
+    latencies = []
+    ready = asyncio.Semaphore(0)
+    go = asyncio.Event()
+    tasks = [asyncio.create_task(run_client(host, port, actions, think, latencies, ready, go, seed + i)) for i in range(clients)]
+    for _ in range(clients):
+        await ready.acquire()
+
+    start = time.perf_counter()
+    go.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies, time.perf_counter() - start
+
+
+async def run_local(clients, actions, think, players, seed):
+    game_server = GameServer(players)
+    server = await asyncio.start_server(game_server.handle_client, '127.0.0.1', 0, backlog=4096)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await run_load('127.0.0.1', port, clients, actions, think, seed)
+
+
+def raise_file_limit():
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the Liar's Dice server")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--actions', type=int, default=20, help="actions each client sends")
+    parser.add_argument('--think', type=float, default=100.0, help="maximum random think time before each action, in ms")
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--host', help="connect to a running server instead of starting one in-process")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    file_limit = raise_file_limit()
+    for clients in args.clients:
+        # Each client needs one socket here, plus one on the server when it runs in-process.
+        needed = clients * (1 if args.host else 2) + 64
+        if file_limit is not None and needed > file_limit:
+            print(f"{clients:>6} clients: skipped, needs ~{needed} open files but the limit is {file_limit}")
+            continue
+        if args.host:
+            latencies, elapsed = asyncio.run(run_load(args.host, args.port, clients, args.actions, args.think, args.seed))
+        else:
+            latencies, elapsed = asyncio.run(run_local(clients, args.actions, args.think, args.players, args.seed))
+
+        if not latencies:
+            print(f"{clients:>6} clients: no actions completed")
+            continue
+        print(f"{clients:>6} clients: {len(latencies)} actions in {elapsed:.2f}s "
+              f"({len(latencies) / elapsed:,.0f}/s)  p50 {percentile(latencies, 50):.2f} ms  p99 {percentile(latencies, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
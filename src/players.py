@@ -0,0 +1,73 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+worker_bots = {}
+
+
+def init_worker(bots):
+    # Bots live in the worker for the whole game so their RNGs carry on
+    # from one turn to the next.
+    worker_bots.update(bots)
+
+
+def think(seat, view, budget):
+    # Runs the bot's anytime search until it finishes or the budget runs
+    # out, and returns the best action found so far.
+    deadline = time.perf_counter() + budget
+    action = None
+    for action in worker_bots[seat].search(view):
+        if time.perf_counter() >= deadline:
+            break
+    return action
+
+
+class BotRunner:
+    # Thinks for the bot seats off the render thread. Each finished turn is
+    # handed to `post` from the executor's thread together with the game
+    # version it was started at, so stale answers can be dropped. A bot that
+    # raised is posted with its exception, for the main thread to re-raise.
+    def __init__(self, bots, post, budget=0.5, processes=True):
+        self.bots = bots
+        self.post = post
+        self.budget = budget
+        if processes:
+            # Spawned workers never inherit the parent's SDL state.
+            self.executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=init_worker, initargs=(bots,))
+        else:
+            self.executor = ThreadPoolExecutor(1, initializer=init_worker, initargs=(bots,))
+        self.pending = None
+        self.closed = False
+
+    def warm_up(self):
+        self.executor.submit(time.sleep, 0).result()
+
+    def is_bot(self, seat):
+        return seat in self.bots
+
+    def start_turn(self, game):
+        seat = game.current_player
+        version = game.version
+        if self.pending == (game, seat, version):
+            return
+        self.pending = (game, seat, version)
+        future = self.executor.submit(think, seat, game.get_player_view(seat), self.budget)
+        future.add_done_callback(lambda f: self.deliver(seat, version, f))
+
+    def deliver(self, seat, version, future):
+        if self.closed or future.cancelled():
+            return
+        error = future.exception()
+        self.post(seat, version, None if error else future.result(), error)
+
+    def finish_turn(self, game, seat, version):
+        # True if this answer belongs to the turn still being waited on.
+        if self.pending != (game, seat, version):
+            return False
+        self.pending = None
+        return True
+
+    def close(self):
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
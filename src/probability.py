@@ -0,0 +1,62 @@
+from functools import lru_cache
+import numpy as np
+
+import bids
+
+FACES = 6
+# Bid codes stop at bids.MAX_DICE dice in play, and so does the engine, so
+# no count of unknown dice can fall off this table.
+MAX_DICE = bids.MAX_DICE
+
+
+@lru_cache(maxsize=None)
+def tail_table(max_dice=MAX_DICE):
+    # table[ones, n, k] = P(at least k of n unknown dice show the bid face).
+    # Ones are wild unless the bid is on ones, so a die matches with 2/6 or 1/6.
+    table = np.zeros((2, max_dice + 1, max_dice + 2))
+    for ones, p in ((0, 2 / FACES), (1, 1 / FACES)):
+        pmf = np.zeros(max_dice + 1)
+        pmf[0] = 1.0
+        for n in range(max_dice + 1):
+            if n > 0:
+                pmf[1:n + 1] = pmf[1:n + 1] * (1 - p) + pmf[:n] * p
+                pmf[0] *= 1 - p
+            tail = np.cumsum(pmf[:n + 1][::-1])[::-1]
+            table[ones, n, :n + 1] = tail
+    table.setflags(write=False)
+    return table
+
+
+def matching_counts(my_dice):
+    counts = np.bincount(np.asarray(my_dice, dtype=np.intp), minlength=FACES + 1)[:FACES + 1]
+    matches = counts.copy()
+    matches[2:] += counts[1]
+    return matches
+
+
+def bid_probability(quantity, face_value, my_dice, unknown_dice):
+    table = tail_table()
+    mine = matching_counts(my_dice)[face_value]
+    needed = min(max(quantity - mine, 0), unknown_dice + 1)
+    return float(table[int(face_value == 1), unknown_dice, needed])
+
+
+QUANTITIES = np.array(bids.QUANTITY, dtype=np.intp)
+FACE_VALUES = np.array(bids.FACE, dtype=np.intp)
+
+
+def legal_bids(current_bid, total_dice):
+    # Legal bids are one slice of the bid tables, so these are views.
+    start = bids.bid_code(current_bid) + 1
+    end = bids.num_bids(total_dice)
+    return QUANTITIES[start:end], FACE_VALUES[start:end]
+
+
+def score_bids(my_dice, unknown_dice, current_bid=None):
+    table = tail_table()
+    quantities, faces = legal_bids(current_bid, len(my_dice) + unknown_dice)
+
+    mine = matching_counts(my_dice)[faces]
+    needed = np.clip(quantities - mine, 0, unknown_dice + 1)
+    probs = table[(faces == 1).astype(np.intp), unknown_dice, needed]
+    return quantities, faces, probs
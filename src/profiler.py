@@ -0,0 +1,175 @@
+import sys
+import time
+import struct
+import argparse
+
+import numpy as np
+
+# Columns of one frame sample, in milliseconds. Sections overlap: 'draw'
+# includes panels, dice, buttons, text and present, and engine calls are
+# counted wherever they happen.
+SECTIONS = ('frame', 'events', 'bots', 'draw', 'panels', 'dice', 'buttons', 'text', 'present', 'view', 'engine')
+
+# Which methods feed each section, by the object they live on.
+GUI_METHODS = {
+    'events': ('handle_events',),
+    'bots': ('update_bots',),
+    'draw': ('draw',),
+    'panels': ('draw_panel',),
+    'dice': ('draw_dice',),
+    'buttons': ('draw_button',),
+    'present': ('present',),
+}
+TEXT_METHODS = {'text': ('lookup',)}
+GAME_METHODS = {
+    'view': ('get_player_view', 'get_view_diff'),
+    'engine': ('make_bid', 'challenge', 'start_new_round'),
+}
+
+TRACE_MAGIC = b'LDFT'
+TRACE_HEADER = struct.Struct('<4sH')
+
+
+class FrameProfiler:
+    # Times a DiceGUI by wrapping its methods on the instance, so nothing is
+    # measured, and nothing costs anything, until attach() is called.
+    def __init__(self, window=600, trace_path=None):
+        self.index = {name: i for i, name in enumerate(SECTIONS)}
+        self.totals = [0.0] * len(SECTIONS)
+        self.history = np.zeros((window, len(SECTIONS)), dtype=np.float32)
+        self.frames = 0
+        self.wrapped = []
+        self.gui = None
+        self.game = None
+        self.last_frame = None
+        self.trace = None
+        if trace_path:
+            self.open_trace(trace_path)
+
+    def timed(self, section, func):
+        totals = self.totals
+        index = self.index[section]
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                totals[index] += clock() - start
+        return wrapper
+
+    def wrap(self, obj, methods):
+        for section, names in methods.items():
+            for name in names:
+                setattr(obj, name, self.timed(section, getattr(obj, name)))
+                self.wrapped.append((obj, name))
+
+    def unwrap(self, obj=None):
+        keep = []
+        for target, name in self.wrapped:
+            if obj is None or target is obj:
+                del target.__dict__[name]
+            else:
+                keep.append((target, name))
+        self.wrapped = keep
+
+    def attach(self, gui):
+        self.gui = gui
+        self.wrap(gui, GUI_METHODS)
+        self.wrap(gui.text_cache, TEXT_METHODS)
+        self.watch_game()
+        self.last_frame = time.perf_counter()
+
+    def detach(self):
+        self.unwrap()
+        self.gui = None
+        self.game = None
+        self.close_trace()
+
+    def watch_game(self):
+        # Restarts reset the GUI's game in place, but follow it anyway if a
+        # caller hands the GUI a different game object.
+        if self.gui.game is not self.game:
+            if self.game is not None:
+                self.unwrap(self.game)
+            self.game = self.gui.game
+            self.wrap(self.game, GAME_METHODS)
+
+    def end_frame(self):
+        now = time.perf_counter()
+        totals = self.totals
+        totals[0] = now - self.last_frame
+        self.last_frame = now
+
+        sample = self.history[self.frames % len(self.history)]
+        sample[:] = totals
+        sample *= 1000
+        if self.trace is not None:
+            self.write_sample(sample)
+        self.frames += 1
+        for i in range(len(totals)):
+            totals[i] = 0.0
+        self.watch_game()
+
+    def percentiles(self, pcts=(50, 95, 99)):
+        samples = self.history[:min(self.frames, len(self.history))]
+        if not len(samples):
+            return np.zeros((len(pcts), len(SECTIONS)))
+        return np.percentile(samples, pcts, axis=0)
+
+    def open_trace(self, path):
+        # Per-frame samples go to CSV for a .csv path, otherwise to a binary
+        # file of float32 rows after a header naming the columns.
+        self.trace_csv = path.endswith('.csv')
+        self.trace = open(path, 'w' if self.trace_csv else 'wb')
+        if self.trace_csv:
+            self.trace.write(','.join(SECTIONS) + '\n')
+        else:
+            names = ','.join(SECTIONS).encode()
+            self.trace.write(TRACE_HEADER.pack(TRACE_MAGIC, len(names)) + names)
+
+    def write_sample(self, sample):
+        if self.trace_csv:
+            self.trace.write(','.join(f'{value:.4f}' for value in sample.tolist()) + '\n')
+        else:
+            self.trace.write(sample.tobytes())
+
+    def close_trace(self):
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+
+def read_trace(path):
+    if path.endswith('.csv'):
+        with open(path) as f:
+            names = f.readline().strip().split(',')
+        return names, np.loadtxt(path, delimiter=',', skiprows=1, dtype=np.float32, ndmin=2)
+    with open(path, 'rb') as f:
+        magic, length = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a frame trace")
+        names = f.read(length).decode().split(',')
+        data = np.frombuffer(f.read(), dtype=np.float32)
+    return names, data.reshape(-1, len(names))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a DiceGUI frame trace")
+    parser.add_argument('trace', help="trace written with DiceGUI(trace_path=...)")
+    args = parser.parse_args(argv)
+
+    names, samples = read_trace(args.trace)
+    if not len(samples):
+        print("no frames in trace")
+        sys.exit(1)
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99), axis=0)
+    print(f"{len(samples)} frames")
+    print(f"{'section':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for i, name in enumerate(names):
+        print(f"{name:<10} {p50[i]:>8.3f} {p95[i]:>8.3f} {p99[i]:>8.3f} {samples[:, i].max():>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
-import pygame
 import sys
-import random
-from pygame.locals import *
+from collections import OrderedDict
+from engine import Die, DiceSet, LiarsDiceGame
+from bids import bid_code, min_quantity
 
-pygame.init()
+pygame = None
 
 BACKGROUND = (28, 40, 56)
 PLAYER1_COLOR = (66, 135, 245)
 PLAYER2_COLOR = (245, 66, 66)
+PLAYER_COLORS = [PLAYER1_COLOR, PLAYER2_COLOR, (80, 200, 120), (245, 190, 60), (170, 100, 230), (60, 200, 210), (240, 120, 190), (160, 160, 160)]
 DICE_COLOR = (255, 255, 255)
 TEXT_COLOR = (255, 255, 255)
 BUTTON_COLOR = (52, 152, 219)
@@ -16,275 +17,305 @@ PANEL_COLOR = (40, 55, 75)
 HIDDEN_COLOR = (60, 60, 80)
 HIDDEN_DOT_COLOR = (100, 100, 100)
 
-class Die:
-    def __init__(self):
-        self.value = random.randint(1, 6)
-        self.held = False
-    
-    def roll(self):
-        if not self.held:
-            self.value = random.randint(1, 6)
+def load_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as pg
+        pygame = pg
+    if not pygame.get_init():
+        pygame.init()
+    return pygame
 
-class DiceSet:
-    def __init__(self, num_dice=5):
-        self.dice = [Die() for _ in range(num_dice)]
+class TextCache:
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.fonts = {}
     
-    def roll_all(self):
-        for die in self.dice:
-            die.roll()
+    def get_font(self, size, bold=False, name='Arial'):
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size, bold=bold)
+            self.fonts[key] = font
+        return font
     
-    def get_values(self):
-        return [die.value for die in self.dice]
+    def lookup(self, key, build):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = build()
+            self.entries[key] = entry
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return entry
     
-    def count_value(self, value):
-        return sum(1 for die in self.dice if die.value == value)
+    def render(self, font, text, color):
+        return self.lookup((font, text, color), lambda: font.render(text, True, color))
     
-    def remove_die(self):
-        if self.dice:
-            return self.dice.pop()
-        return None
+    def fit(self, font, text, color, max_width, smaller_font=None, truncate=False):
+        key = ('fit', font, text, color, max_width, smaller_font, truncate)
+        return self.lookup(key, lambda: self.build_fit(font, text, color, max_width, smaller_font, truncate))
     
-    def size(self):
-        return len(self.dice)
-
-class LiarsDiceGame:
-    def __init__(self):
-        self.players = [DiceSet(), DiceSet()]
-        self.current_player = 0
-        self.current_bid = None
-        self.round_active = True
-        self.message = ""
-        self.game_over = False
-        self.winner = None
-        self.all_dice_revealed = False
-        self.challenge_result = ""
-    
-    def roll_all_dice(self):
-        for player in self.players:
-            player.roll_all()
-        self.all_dice_revealed = False
-        self.challenge_result = ""
-    
-    def make_bid(self, player, quantity, face_value):
-        if player != self.current_player or not self.round_active:
-            return False
+    def build_fit(self, font, text, color, max_width, smaller_font, truncate):
+        if smaller_font is None or font.size(text)[0] <= max_width:
+            return font.render(text, True, color)
         
-        if self.current_bid:
-            q, v = self.current_bid
-            if quantity < q or (quantity == q and face_value <= v):
-                return False
+        if truncate and smaller_font.size(text)[0] > max_width:
+            for i in range(len(text), 0, -1):
+                truncated = text[:i] + "..."
+                if smaller_font.size(truncated)[0] <= max_width:
+                    return smaller_font.render(truncated, True, color)
         
-        self.current_bid = (quantity, face_value)
-        self.current_player = 1 - self.current_player
-        self.message = f"Player {self.current_player + 1}'s turn"
-        self.challenge_result = ""
-        return True
+        return smaller_font.render(text, True, color)
     
-    def challenge(self, player):
-        if player != self.current_player or not self.round_active or not self.current_bid:
-            return False
-        
-        self.all_dice_revealed = True
-        
-        total_count = 0
-        for p in self.players:
-            total_count += p.count_value(self.current_bid[1])
-            if self.current_bid[1] != 1:
-                total_count += p.count_value(1)
-        
-        bid_quantity, bid_value = self.current_bid
-        
-        if total_count >= bid_quantity:
-            loser = player
-            self.challenge_result = f"Challenge failed! Total {total_count} {bid_value}s"
-            self.message = f"Player {loser + 1} loses a die"
-        else:
-            loser = 1 - player
-            self.challenge_result = f"Challenge succeeded! Only {total_count} {bid_value}s"
-            self.message = f"Player {loser + 1} loses a die"
-        
-        self.players[loser].remove_die()
-        
-        self.current_bid = None
-        self.round_active = False
-        
-        if self.players[loser].size() == 0:
-            winner = 1 - loser
-            self.winner = winner
-            self.game_over = True
-            self.message = f"Player {winner + 1} wins!"
-            self.challenge_result = ""
-        
-        return True
+    def wrap(self, font, text, max_width):
+        return self.lookup(('wrap', font, text, max_width), lambda: self.build_wrap(font, text, max_width))
     
-    def start_new_round(self):
-        if self.game_over:
-            self.__init__()
-        else:
-            self.roll_all_dice()
-            self.current_player = random.randint(0, 1)
-            self.current_bid = None
-            self.round_active = True
-            self.all_dice_revealed = False
-            self.message = f"Player {self.current_player + 1}'s turn"
-            self.challenge_result = ""
-    
-    def get_player_view(self, player_perspective):
-        state = {
-            'current_player': self.current_player,
-            'current_bid': self.current_bid,
-            'player_counts': [p.size() for p in self.players],
-            'message': self.message,
-            'round_active': self.round_active,
-            'game_over': self.game_over,
-            'winner': self.winner,
-            'all_dice_revealed': self.all_dice_revealed,
-            'challenge_result': self.challenge_result
-        }
-        
-        state['player1_dice'] = self.players[0].get_values()
-        state['player2_dice'] = self.players[1].get_values()
-        state['player1_count'] = self.players[0].size()
-        state['player2_count'] = self.players[1].size()
-        
-        if self.all_dice_revealed or self.game_over:
-            state['visible_player1_dice'] = state['player1_dice']
-            state['visible_player2_dice'] = state['player2_dice']
-        else:
-            if player_perspective == 0:
-                state['visible_player1_dice'] = state['player1_dice']
-                state['visible_player2_dice'] = ['?' for _ in range(state['player2_count'])]
+    def build_wrap(self, font, text, max_width):
+        if font.size(text)[0] <= max_width:
+            return (text,)
+        
+        lines = []
+        current_line = ""
+        for word in text.split(' '):
+            test_line = current_line + " " + word if current_line else word
+            if font.size(test_line)[0] > max_width:
+                lines.append(current_line)
+                current_line = word
             else:
-                state['visible_player1_dice'] = ['?' for _ in range(state['player1_count'])]
-                state['visible_player2_dice'] = state['player2_dice']
-        
-        state['perspective'] = player_perspective
-        
-        return state
+                current_line = test_line
+        if current_line:
+            lines.append(current_line)
+        return tuple(lines)
+
+class Layer:
+    def __init__(self, rect, cache_size=8):
+        self.rect = rect.clip(pygame.display.get_surface().get_rect())
+        self.key = None
+        self.valid = False
+        self.cache_size = cache_size
+        self.surfaces = OrderedDict()
+    
+    def get(self, key):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+        return surface
+    
+    def store(self, key, surface):
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.cache_size:
+            self.surfaces.popitem(last=False)
 
 class DiceGUI:
-    def __init__(self):
-        screen_info = pygame.display.Info()
-        resolution = (screen_info.current_w, screen_info.current_h)
-        if resolution[0] < 1920 or resolution[1] < 1080:
-            resolution = (1920, 1080)
+    def __init__(self, num_players=2, retained=True, bots=None, think_time=0.5, bot_processes=True, profile=False, trace_path=None, resolution=None, fullscreen=True):
+        load_pygame()
+        
+        if resolution is None:
+            screen_info = pygame.display.Info()
+            resolution = (screen_info.current_w, screen_info.current_h)
+            if resolution[0] < 1920 or resolution[1] < 1080:
+                resolution = (1920, 1080)
+        self.fullscreen = fullscreen
         
-        self.screen = pygame.display.set_mode(resolution, pygame.FULLSCREEN)
         pygame.display.set_caption("Liar's Dice")
         self.clock = pygame.time.Clock()
         
-        self.resolution = resolution
-        self.screen_width = resolution[0]
-        self.screen_height = resolution[1]
-        
-        self.dice_size = 60
         self.font_size_title = 40
         self.font_size_large = 28
         self.font_size_medium = 20
         self.font_size_small = 16
         
-        self.title_font = pygame.font.SysFont('Arial', self.font_size_title, bold=True)
-        self.font = pygame.font.SysFont('Arial', self.font_size_large)
-        self.small_font = pygame.font.SysFont('Arial', self.font_size_medium)
-        self.tiny_font = pygame.font.SysFont('Arial', self.font_size_small)
+        self.text_cache = TextCache()
         
-        self.game = LiarsDiceGame()
+        self.num_players = num_players
+        self.game = LiarsDiceGame(num_players)
         
-        self.dice_faces = {}
-        self.hidden_dice_face = None
-        self.create_dice_faces()
+        self.atlas = None
+        self.atlas_key = None
         
         self.selected_quantity = 1
         self.selected_face = 2
-        self.max_quantity = 10
         
         self.current_perspective = 0
         self.perspective_locked = False
         
-        center_x = self.screen_width // 2
+        self.retained = retained
+        self.set_resolution(resolution)
+        
+        self.running = False
+        
+        self.view = None
+        self.view_game = None
+        self.view_perspective = None
+        self.view_version = -1
+        self.pending_events = []
+        
+        self.solver = None
+        self.round_bids = []
+        self.hint = None
+        self.hint_version = -1
+        
+        self.bot_event = pygame.event.custom_type()
+        self.bot_runner = None
+        if bots:
+            from players import BotRunner
+            self.bot_runner = BotRunner(bots, self.post_bot_action, think_time, bot_processes)
+            self.bot_runner.warm_up()
+        
+        self.profiler = None
+        self.profiler_overlay = False
+        if profile or trace_path:
+            self.enable_profiler(trace_path)
+    
+    def set_resolution(self, resolution):
+        self.screen = pygame.display.set_mode(resolution, pygame.FULLSCREEN if self.fullscreen else 0)
+        self.resolution = resolution
+        self.screen_width = resolution[0]
+        self.screen_height = resolution[1]
         
-        self.button_width = 180
-        self.button_height = 45
+        # The layout is designed for 1920x1080; every rect, offset and font
+        # is scaled from there with the display.
+        self.scale = min(self.screen_width / 1920, self.screen_height / 1080)
+        self.title_font = self.text_cache.get_font(self.scaled(self.font_size_title), bold=True)
+        self.font = self.text_cache.get_font(self.scaled(self.font_size_large))
+        self.small_font = self.text_cache.get_font(self.scaled(self.font_size_medium))
+        self.tiny_font = self.text_cache.get_font(self.scaled(self.font_size_small))
+        self.label_font = self.tiny_font
+        self.button_width = self.scaled(180)
+        self.button_height = self.scaled(45)
+        self.dice_size = self.scaled(60)
+        self.dice_gap = self.scaled(15)
+        
+        self.setup_buttons()
+        self.setup_panels()
+        self.build_atlas()
+        self.setup_layers()
+    
+    def scaled(self, value):
+        return round(value * self.scale)
+    
+    def setup_buttons(self):
+        center_x = self.screen_width // 2
+        bottom = self.screen_height
+        s = self.scaled
         
-        self.bid_button = pygame.Rect(center_x - 200, self.screen_height - 120, self.button_width, self.button_height)
-        self.challenge_button = pygame.Rect(center_x + 20, self.screen_height - 120, self.button_width, self.button_height)
-        self.new_round_button = pygame.Rect(center_x - self.button_width // 2, self.screen_height - 120, self.button_width, self.button_height)
-        self.restart_button = pygame.Rect(center_x - self.button_width // 2, self.screen_height - 60, self.button_width, self.button_height)
+        self.bid_button = pygame.Rect(center_x - s(200), bottom - s(120), self.button_width, self.button_height)
+        self.challenge_button = pygame.Rect(center_x + s(20), bottom - s(120), self.button_width, self.button_height)
+        self.new_round_button = pygame.Rect(center_x - self.button_width // 2, bottom - s(120), self.button_width, self.button_height)
+        self.restart_button = pygame.Rect(center_x - self.button_width // 2, bottom - s(60), self.button_width, self.button_height)
         
-        self.switch_view_button = pygame.Rect(self.screen_width - 200, 20, 180, self.button_height)
+        self.switch_view_button = pygame.Rect(self.screen_width - s(200), s(20), s(180), self.button_height)
         
         self.face_buttons = []
         for i in range(1, 7):
-            btn_x = center_x - 140 + (i-1) * 50
-            btn = pygame.Rect(btn_x, self.screen_height - 220, 45, 45)
+            btn_x = center_x - s(140) + s((i-1) * 50)
+            btn = pygame.Rect(btn_x, bottom - s(220), s(45), s(45))
             self.face_buttons.append(btn)
         
-        self.quantity_up = pygame.Rect(center_x + 100, self.screen_height - 290, 45, 40)
-        self.quantity_down = pygame.Rect(center_x - 145, self.screen_height - 290, 45, 40)
-        
-        self.turn_reminder = pygame.Rect(50, self.screen_height - 90, 300, self.button_height)
+        self.quantity_up = pygame.Rect(center_x + s(100), bottom - s(290), s(45), s(40))
+        self.quantity_down = pygame.Rect(center_x - s(145), bottom - s(290), s(45), s(40))
         
-        self.setup_panels()
+        self.turn_reminder = pygame.Rect(s(50), bottom - s(90), s(300), self.button_height)
     
     def setup_panels(self):
         center_x = self.screen_width // 2
+        s = self.scaled
+        
+        self.player_panel_width = s(600)
+        self.player_panel_height = s(180)
+        
+        if self.num_players > 6:
+            self.player_panel_height = s(160)
         
-        self.player_panel_width = 600
-        self.player_panel_height = 180
+        self.player_panels = []
+        for i in range(self.num_players):
+            if i < 4:
+                panel_x = s(50)
+                panel_y = s(100 + i * 200)
+            else:
+                panel_x = self.screen_width - s(50) - self.player_panel_width
+                panel_y = s(370) + (i - 4) * (self.player_panel_height + s(12))
+            self.player_panels.append(pygame.Rect(panel_x, panel_y, self.player_panel_width, self.player_panel_height))
+        
+        self.bid_panel = pygame.Rect(center_x - s(300), s(250), s(600), s(70))
         
-        self.player1_panel = pygame.Rect(50, 100, self.player_panel_width, self.player_panel_height)
-        self.player2_panel = pygame.Rect(50, 300, self.player_panel_width, self.player_panel_height)
+        self.message_panel = pygame.Rect(center_x - s(300), s(330), s(600), s(40))
         
-        self.bid_panel = pygame.Rect(center_x - 300, 250, 600, 70)
+        self.challenge_panel = pygame.Rect(center_x - s(300), s(380), s(600), s(40))
         
-        self.message_panel = pygame.Rect(center_x - 300, 330, 600, 40)
+        self.bid_control_panel = pygame.Rect(center_x - s(250), self.screen_height - s(350), s(500), s(180))
         
-        self.challenge_panel = pygame.Rect(center_x - 300, 380, 600, 40)
+        self.instructions_panel = pygame.Rect(self.screen_width - s(380), s(100), s(350), s(250))
         
-        self.bid_control_panel = pygame.Rect(center_x - 250, self.screen_height - 350, 500, 180)
+        self.winner_panel = pygame.Rect(center_x - s(300), s(430), s(600), s(80))
         
-        self.instructions_panel = pygame.Rect(self.screen_width - 380, 100, 350, 250)
+        self.status_area = pygame.Rect(center_x - s(300), s(425), s(600), s(115))
         
-        self.winner_panel = pygame.Rect(center_x - 300, 430, 600, 80)
+        self.controls_area = pygame.Rect(center_x - s(250), self.screen_height - s(350), s(500), s(345))
     
-    def create_dice_faces(self):
+    def build_atlas(self):
+        # Faces, the hidden face and the index labels are drawn once into a
+        # single surface per dice size; draw_dice only blits regions of it.
+        key = (self.dice_size, self.label_font.get_height(), self.game.num_dice)
+        if key == self.atlas_key:
+            return
+        self.atlas_key = key
+        
+        size = self.dice_size
+        labels = [self.label_font.render(str(i + 1), True, (0, 0, 0)) for i in range(self.game.num_dice)]
+        label_height = max(label.get_height() for label in labels)
+        width = max(7 * size, sum(label.get_width() for label in labels))
+        self.atlas = pygame.Surface((width, size + label_height), pygame.SRCALPHA)
+        self.atlas.fill((0, 0, 0, 0))
+        
+        dot_radius = size // 12
+        positions = {
+            1: [(size // 2, size // 2)],
+            2: [(size // 4, size // 4), (3*size // 4, 3*size // 4)],
+            3: [(size // 4, size // 4), (size // 2, size // 2), (3*size // 4, 3*size // 4)],
+            4: [(size // 4, size // 4), (3*size // 4, size // 4), 
+                (size // 4, 3*size // 4), (3*size // 4, 3*size // 4)],
+            5: [(size // 4, size // 4), (3*size // 4, size // 4), 
+                (size // 2, size // 2), 
+                (size // 4, 3*size // 4), (3*size // 4, 3*size // 4)],
+            6: [(size // 4, size // 4), (3*size // 4, size // 4), 
+                (size // 4, size // 2), (3*size // 4, size // 2),
+                (size // 4, 3*size // 4), (3*size // 4, 3*size // 4)]
+        }
+        
+        self.face_areas = {}
         for value in range(1, 7):
-            surf = pygame.Surface((self.dice_size, self.dice_size), pygame.SRCALPHA)
-            pygame.draw.rect(surf, DICE_COLOR, (0, 0, self.dice_size, self.dice_size), border_radius=8)
-            pygame.draw.rect(surf, (0, 0, 0), (0, 0, self.dice_size, self.dice_size), 2, border_radius=8)
-            
-            dot_radius = self.dice_size // 12
-            
-            positions = {
-                1: [(self.dice_size // 2, self.dice_size // 2)],
-                2: [(self.dice_size // 4, self.dice_size // 4), (3*self.dice_size // 4, 3*self.dice_size // 4)],
-                3: [(self.dice_size // 4, self.dice_size // 4), (self.dice_size // 2, self.dice_size // 2), (3*self.dice_size // 4, 3*self.dice_size // 4)],
-                4: [(self.dice_size // 4, self.dice_size // 4), (3*self.dice_size // 4, self.dice_size // 4), 
-                    (self.dice_size // 4, 3*self.dice_size // 4), (3*self.dice_size // 4, 3*self.dice_size // 4)],
-                5: [(self.dice_size // 4, self.dice_size // 4), (3*self.dice_size // 4, self.dice_size // 4), 
-                    (self.dice_size // 2, self.dice_size // 2), 
-                    (self.dice_size // 4, 3*self.dice_size // 4), (3*self.dice_size // 4, 3*self.dice_size // 4)],
-                6: [(self.dice_size // 4, self.dice_size // 4), (3*self.dice_size // 4, self.dice_size // 4), 
-                    (self.dice_size // 4, self.dice_size // 2), (3*self.dice_size // 4, self.dice_size // 2),
-                    (self.dice_size // 4, 3*self.dice_size // 4), (3*self.dice_size // 4, 3*self.dice_size // 4)]
-            }
-            
+            area = pygame.Rect((value - 1) * size, 0, size, size)
+            surf = self.atlas.subsurface(area)
+            pygame.draw.rect(surf, DICE_COLOR, (0, 0, size, size), border_radius=8)
+            pygame.draw.rect(surf, (0, 0, 0), (0, 0, size, size), 2, border_radius=8)
             for pos in positions[value]:
                 pygame.draw.circle(surf, (0, 0, 0), pos, dot_radius)
-            
-            self.dice_faces[value] = surf
+            self.face_areas[value] = area
         
-        self.hidden_dice_face = pygame.Surface((self.dice_size, self.dice_size), pygame.SRCALPHA)
-        pygame.draw.rect(self.hidden_dice_face, HIDDEN_COLOR, (0, 0, self.dice_size, self.dice_size), border_radius=8)
-        pygame.draw.rect(self.hidden_dice_face, (100, 100, 100), (0, 0, self.dice_size, self.dice_size), 2, border_radius=8)
-        
-        dot_radius = self.dice_size // 12
+        area = pygame.Rect(6 * size, 0, size, size)
+        surf = self.atlas.subsurface(area)
+        pygame.draw.rect(surf, HIDDEN_COLOR, (0, 0, size, size), border_radius=8)
+        pygame.draw.rect(surf, (100, 100, 100), (0, 0, size, size), 2, border_radius=8)
         for i in range(3):
             for j in range(3):
                 if not (i == 1 and j == 1):
-                    x = self.dice_size // 4 + i * (self.dice_size // 4)
-                    y = self.dice_size // 4 + j * (self.dice_size // 4)
-                    pygame.draw.circle(self.hidden_dice_face, HIDDEN_DOT_COLOR, (x, y), dot_radius)
+                    x = size // 4 + i * (size // 4)
+                    y = size // 4 + j * (size // 4)
+                    pygame.draw.circle(surf, HIDDEN_DOT_COLOR, (x, y), dot_radius)
+        self.face_areas['?'] = area
+        
+        # Labels are copied in as-is, so they blend exactly like a fresh render.
+        self.label_areas = []
+        label_x = 0
+        for label in labels:
+            area = pygame.Rect(label_x, size, label.get_width(), label.get_height())
+            self.atlas.blit(label, area, special_flags=pygame.BLEND_RGBA_MAX)
+            self.label_areas.append(area)
+            label_x += label.get_width()
     
     def draw_button(self, rect, text, hover=False, color=None, font=None, border=True):
         if font is None:
@@ -297,100 +328,177 @@ class DiceGUI:
         if border:
             pygame.draw.rect(self.screen, (255, 255, 255), rect, 2, border_radius=5)
         
-        text_surf = font.render(text, True, TEXT_COLOR)
-        
-        if text_surf.get_width() > rect.width - 20:
-            smaller_font = pygame.font.SysFont('Arial', font.get_height() - 4)
-            text_surf = smaller_font.render(text, True, TEXT_COLOR)
+        smaller_font = self.text_cache.get_font(font.get_height() - 4)
+        text_surf = self.text_cache.fit(font, text, TEXT_COLOR, rect.width - self.scaled(20), smaller_font)
         
         text_rect = text_surf.get_rect(center=rect.center)
         self.screen.blit(text_surf, text_rect)
     
     def draw_dice(self, dice_values, x, y, player_num, is_hidden=False):
-        color = PLAYER1_COLOR if player_num == 0 else PLAYER2_COLOR
+        color = PLAYER_COLORS[player_num % len(PLAYER_COLORS)]
         
+        size = self.dice_size
+        pad = self.scaled(10)
         dice_count = len(dice_values)
-        group_width = dice_count * (self.dice_size + 15) + 20
-        group_height = self.dice_size + 40
+        group_width = dice_count * (size + self.dice_gap) + 2 * pad
+        group_height = size + 4 * pad
         
         if is_hidden:
-            pygame.draw.rect(self.screen, (40, 40, 60), (x-10, y-10, group_width, group_height), border_radius=8)
-            pygame.draw.rect(self.screen, (80, 80, 100), (x-10, y-10, group_width, group_height), 2, border_radius=8)
+            pygame.draw.rect(self.screen, (40, 40, 60), (x-pad, y-pad, group_width, group_height), border_radius=8)
+            pygame.draw.rect(self.screen, (80, 80, 100), (x-pad, y-pad, group_width, group_height), 2, border_radius=8)
         else:
-            pygame.draw.rect(self.screen, color, (x-10, y-10, group_width, group_height), border_radius=8)
+            pygame.draw.rect(self.screen, color, (x-pad, y-pad, group_width, group_height), border_radius=8)
         
+        label_y = y + size + self.scaled(15)
+        blits = []
         for i, value in enumerate(dice_values):
-            dice_x = x + i * (self.dice_size + 15)
-            
-            if value == '?':
-                self.screen.blit(self.hidden_dice_face, (dice_x, y))
-            else:
-                self.screen.blit(self.dice_faces[value], (dice_x, y))
+            dice_x = x + i * (size + self.dice_gap)
+            blits.append((self.atlas, (dice_x, y), self.face_areas[value]))
             
             if value != '?':
-                num_text = self.tiny_font.render(str(i+1), True, (0, 0, 0))
-                num_rect = num_text.get_rect(center=(dice_x + self.dice_size//2, y + self.dice_size + 15))
-                self.screen.blit(num_text, num_rect)
+                area = self.label_areas[i]
+                blits.append((self.atlas, (dice_x + size//2 - area.width//2, label_y - area.height//2), area))
+        self.screen.blits(blits, doreturn=False)
     
     def draw_panel(self, rect, title=None, title_color=TEXT_COLOR):
         pygame.draw.rect(self.screen, PANEL_COLOR, rect, border_radius=10)
         pygame.draw.rect(self.screen, (100, 100, 120), rect, 2, border_radius=10)
         
         if title:
-            title_surf = self.small_font.render(title, True, title_color)
-            title_x = rect.x + 15
-            title_y = rect.y + 8
+            title_surf = self.text_cache.render(self.small_font, title, title_color)
+            title_x = rect.x + self.scaled(15)
+            title_y = rect.y + self.scaled(8)
             self.screen.blit(title_surf, (title_x, title_y))
     
     def draw_player_panel(self, panel_rect, player_num, dice_values, dice_count, is_hidden=False, is_current_turn=False):
         player_title = f"Player {player_num + 1} - {dice_count} dice"
-        self.draw_panel(panel_rect, player_title, PLAYER1_COLOR if player_num == 0 else PLAYER2_COLOR)
+        self.draw_panel(panel_rect, player_title, PLAYER_COLORS[player_num % len(PLAYER_COLORS)])
         
         if is_current_turn:
-            turn_text = self.small_font.render("TURN", True, (255, 215, 0))
-            self.screen.blit(turn_text, (panel_rect.x + panel_rect.width - 60, panel_rect.y + 10))
+            turn_text = self.text_cache.render(self.small_font, "TURN", (255, 215, 0))
+            self.screen.blit(turn_text, (panel_rect.right - self.scaled(60), panel_rect.y + self.scaled(10)))
         
-        dice_x = panel_rect.x + 20
-        dice_y = panel_rect.y + 50
+        dice_x = panel_rect.x + self.scaled(20)
+        dice_y = panel_rect.y + self.scaled(50)
         
         self.draw_dice(dice_values, dice_x, dice_y, player_num, is_hidden)
     
     def draw_bid_controls(self, center_x):
         self.draw_panel(self.bid_control_panel, f"Player {self.current_perspective + 1}'s Bid")
         
-        q_text = self.font.render(f"Quantity: {self.selected_quantity}", True, TEXT_COLOR)
+        q_text = self.text_cache.render(self.font, f"Quantity: {self.selected_quantity}", TEXT_COLOR)
         q_x = center_x - q_text.get_width() // 2
-        q_y = self.bid_control_panel.y + 45
+        q_y = self.bid_control_panel.y + self.scaled(45)
         self.screen.blit(q_text, (q_x, q_y))
         
-        f_text = self.font.render("Face Value:", True, TEXT_COLOR)
+        f_text = self.text_cache.render(self.font, "Face Value:", TEXT_COLOR)
         f_x = center_x - f_text.get_width() // 2
-        f_y = self.bid_control_panel.y + 95
+        f_y = self.bid_control_panel.y + self.scaled(95)
         self.screen.blit(f_text, (f_x, f_y))
     
+    def current_view(self):
+        game = self.game
+        if self.view is None or self.view_game is not game or self.view_perspective != self.current_perspective:
+            self.view_version, self.view = game.get_view_diff(self.current_perspective)
+            visible_dice = [None] * game.num_players
+            for i, values in self.view['visible_dice']:
+                visible_dice[i] = values
+            self.view['visible_dice'] = visible_dice
+            self.view_game = game
+            self.view_perspective = self.current_perspective
+        elif game.version != self.view_version:
+            self.view_version, changes = game.get_view_diff(self.current_perspective, self.view_version)
+            for i, values in changes.pop('visible_dice', ()):
+                self.view['visible_dice'][i] = values
+            self.view.update(changes)
+        return self.view
+    
+    def wait_for_event(self, timeout):
+        event = pygame.event.wait(timeout)
+        if event.type != pygame.NOEVENT:
+            self.pending_events.append(event)
+    
+    def post_bot_action(self, seat, version, action, error=None):
+        # Called from the bot worker's thread; pygame.event.post is thread-safe,
+        # and the event wakes an idle event-driven loop.
+        pygame.event.post(pygame.event.Event(self.bot_event, seat=seat, version=version, action=action, error=error))
+    
+    def is_bot(self, seat):
+        return self.bot_runner is not None and self.bot_runner.is_bot(seat)
+    
+    def viewer_for(self, seat):
+        # Hot-seat play follows the player to move, but never onto a bot's dice.
+        return self.current_perspective if self.is_bot(seat) else seat
+    
+    def apply_bot_action(self, event):
+        # A crashing bot is a bug, not a move.
+        if event.error is not None:
+            raise event.error
+        if not self.bot_runner.finish_turn(self.game, event.seat, event.version):
+            return
+        action = event.action or ('challenge',)
+        if action[0] == 'challenge':
+            played = self.game.challenge(event.seat)
+        else:
+            played = self.play_bid(event.seat, action[1], action[2])
+        if not played and not self.game.challenge(event.seat):
+            self.play_bid(event.seat, 1, 2)
+        if not self.game.round_active:
+            self.perspective_locked = True
+        else:
+            self.current_perspective = self.viewer_for(self.game.current_player)
+    
+    def play_bid(self, seat, quantity, face_value):
+        # Bids are kept for the round so a hint can read them back.
+        opening = self.game.current_bid is None
+        if not self.game.make_bid(seat, quantity, face_value):
+            return False
+        if opening:
+            self.round_bids = []
+        self.round_bids.append((seat, quantity, face_value))
+        return True
+    
+    def update_bots(self):
+        game = self.game
+        if game.round_active and not game.game_over and self.is_bot(game.current_player):
+            self.bot_runner.start_turn(game)
+    
     def handle_events(self):
         mouse_pos = pygame.mouse.get_pos()
-        state = self.game.get_player_view(self.current_perspective)
+        state = self.current_view()
+        
+        events = self.pending_events + pygame.event.get()
+        self.pending_events = []
         
-        for event in pygame.event.get():
-            if event.type == QUIT:
+        for event in events:
+            if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             
-            if event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
+            if event.type == self.bot_event:
+                self.apply_bot_action(event)
+                state = self.current_view()
+            
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
+                
+                if event.key == pygame.K_F3:
+                    self.toggle_profiler_overlay()
+                
+                if event.key == pygame.K_h and state['round_active'] and self.current_perspective == state['current_player']:
+                    self.show_hint()
             
-            if event.type == MOUSEBUTTONDOWN:
+            if event.type == pygame.MOUSEBUTTONDOWN:
                 if self.switch_view_button.collidepoint(mouse_pos) and not self.perspective_locked:
-                    self.current_perspective = 1 - self.current_perspective
+                    self.current_perspective = (self.current_perspective + 1) % self.num_players
                 
                 if self.quantity_up.collidepoint(mouse_pos) and state['round_active'] and self.current_perspective == state['current_player']:
-                    self.selected_quantity = min(self.max_quantity, self.selected_quantity + 1)
+                    self.selected_quantity = min(self.max_quantity(), self.selected_quantity + 1)
                 
                 if self.quantity_down.collidepoint(mouse_pos) and state['round_active'] and self.current_perspective == state['current_player']:
-                    self.selected_quantity = max(1, self.selected_quantity - 1)
+                    self.selected_quantity = max(self.min_quantity(), self.selected_quantity - 1)
                 
                 if state['round_active'] and self.current_perspective == state['current_player']:
                     for i, btn in enumerate(self.face_buttons):
@@ -398,9 +506,8 @@ class DiceGUI:
                             self.selected_face = i + 1
                 
                 if self.bid_button.collidepoint(mouse_pos) and state['round_active'] and self.current_perspective == state['current_player']:
-                    if self.game.make_bid(state['current_player'], self.selected_quantity, self.selected_face):
-                        self.selected_quantity = max(1, self.selected_quantity)
-                        self.current_perspective = 1 - self.current_perspective
+                    if self.play_bid(state['current_player'], self.selected_quantity, self.selected_face):
+                        self.current_perspective = self.viewer_for(self.game.current_player)
                 
                 if self.challenge_button.collidepoint(mouse_pos) and state['round_active'] and self.current_perspective == state['current_player']:
                     self.game.challenge(state['current_player'])
@@ -409,88 +516,176 @@ class DiceGUI:
                 if self.new_round_button.collidepoint(mouse_pos) and not state['round_active'] and not state['game_over']:
                     self.game.start_new_round()
                     self.perspective_locked = False
-                    self.current_perspective = self.game.current_player
+                    self.current_perspective = self.viewer_for(self.game.current_player)
                 
                 if self.restart_button.collidepoint(mouse_pos) and state['game_over']:
-                    self.game = LiarsDiceGame()
+                    self.game.reset()
                     self.game.start_new_round()
                     self.perspective_locked = False
-                    self.current_perspective = 0
-    
-    def draw(self):
-        self.screen.fill(BACKGROUND)
-        state = self.game.get_player_view(self.current_perspective)
-        center_x = self.screen_width // 2
+                    self.current_perspective = self.viewer_for(0)
         
-        title = self.title_font.render("LIAR'S DICE", True, (255, 215, 0))
-        self.screen.blit(title, (center_x - title.get_width() // 2, 20))
+        self.clamp_selection()
+    
+    def max_quantity(self):
+        return self.game.total_dice()
+    
+    def min_quantity(self):
+        return min_quantity(bid_code(self.game.current_bid), self.selected_face)
+    
+    def clamp_selection(self):
+        # Keep the pickers on a legal bid as the bid and dice in play change.
+        low = self.min_quantity()
+        high = max(low, self.max_quantity())
+        self.selected_quantity = min(max(self.selected_quantity, low), high)
+    
+    def show_hint(self):
+        # Two-player endgames are small enough to search; otherwise
+        # judge bids by what this round's bids say about the hidden dice.
+        from endgame import EndgameSolver
+        
+        if self.solver is None:
+            self.solver = EndgameSolver()
+        view = self.game.get_player_view(self.current_perspective)
+        if not self.solver.solvable(view):
+            self.show_belief_hint(view)
+        else:
+            action, _ = self.solver.best_action(view)
+            if action[0] == 'challenge':
+                self.hint = "Hint: challenge (endgame search)"
+            else:
+                self.selected_quantity = action[1]
+                self.selected_face = action[2]
+                self.hint = f"Hint: bid {action[1]} x {action[2]}s (endgame search)"
+        self.hint_version = self.game.version
+    
+    def show_belief_hint(self, view):
+        from belief import BeliefBot
+        
+        bot = BeliefBot()
+        tracker = bot.tracker
+        tracker.new_round(self.game.dice_counts)
+        if view['current_bid'] is not None:
+            for bid in self.round_bids:
+                tracker.observe_bid(*bid)
+        me = view['perspective']
+        my_dice = view['dice'][me]
+        action = bot.act(view)
+        if action[0] == 'challenge':
+            quantity, face_value = view['current_bid']
+            p = tracker.bid_probability(quantity, face_value, my_dice, me)
+            self.hint = f"Hint: challenge (bid is {p:.0%} likely)"
+        else:
+            self.selected_quantity = action[1]
+            self.selected_face = action[2]
+            p = tracker.bid_probability(action[1], action[2], my_dice, me)
+            self.hint = f"Hint: bid {action[1]} x {action[2]}s ({p:.0%} likely)"
+    
+    def enable_profiler(self, trace_path=None):
+        from profiler import FrameProfiler
         
-        perspective_text = f"Viewing: Player {self.current_perspective + 1}"
-        perspective_surf = self.small_font.render(perspective_text, True, PLAYER1_COLOR if self.current_perspective == 0 else PLAYER2_COLOR)
-        self.screen.blit(perspective_surf, (50, 70))
+        self.profiler = FrameProfiler(trace_path=trace_path)
+        self.profiler.attach(self)
+    
+    def toggle_profiler_overlay(self):
+        self.profiler_overlay = not self.profiler_overlay
+        if self.profiler_overlay and self.profiler is None:
+            self.enable_profiler()
+        elif not self.profiler_overlay and self.profiler.trace is None:
+            self.profiler.detach()
+            self.profiler = None
+        self.invalidate()
+    
+    def setup_layers(self):
+        self.layers = {
+            'header': Layer(pygame.Rect(0, 0, self.screen_width - self.scaled(220), self.scaled(98))),
+            'switch': Layer(self.switch_view_button.copy()),
+            'bid': Layer(self.bid_panel.copy()),
+            'message': Layer(self.message_panel.copy()),
+            'challenge': Layer(self.challenge_panel.copy()),
+            'status': Layer(self.status_area.copy()),
+            'instructions': Layer(self.instructions_panel.copy()),
+            'controls': Layer(self.controls_area.copy()),
+            'turn': Layer(self.turn_reminder.copy()),
+        }
+        for i, panel in enumerate(self.player_panels):
+            self.layers[f'player{i + 1}'] = Layer(panel.copy())
+        self.dirty_rects = []
+        self.needs_full_redraw = True
+        self.frame_changed = True
+        self.layers_changed = True
+    
+    def invalidate(self):
+        self.needs_full_redraw = True
+    
+    def update_layer(self, name, key, draw_func, *args):
+        layer = self.layers[name]
+        if layer.valid and key == layer.key:
+            return
+        
+        # Without retained mode every layer is redrawn each frame, so this
+        # is what tells the loop whether the frame showed anything new.
+        if key != layer.key:
+            self.layers_changed = True
+        layer.key = key
+        layer.valid = True
+        if layer.rect.width == 0 or layer.rect.height == 0:
+            return
+        
+        cached = layer.get(key)
+        if cached is None:
+            self.screen.set_clip(layer.rect)
+            self.screen.fill(BACKGROUND, layer.rect)
+            draw_func(*args)
+            self.screen.set_clip(None)
+            layer.store(key, self.screen.subsurface(layer.rect).copy())
+        else:
+            self.screen.blit(cached, layer.rect)
         
-        player1_is_hidden = (state['visible_player1_dice'][0] == '?') if state['visible_player1_dice'] else False
-        player2_is_hidden = (state['visible_player2_dice'][0] == '?') if state['visible_player2_dice'] else False
+        self.dirty_rects.append(layer.rect)
+    
+    def draw_header(self):
+        center_x = self.screen_width // 2
         
-        self.draw_player_panel(self.player1_panel, 0, state['visible_player1_dice'], state['player1_count'], player1_is_hidden, state['current_player'] == 0)
-        self.draw_player_panel(self.player2_panel, 1, state['visible_player2_dice'], state['player2_count'], player2_is_hidden, state['current_player'] == 1)
+        title = self.text_cache.render(self.title_font, "LIAR'S DICE", (255, 215, 0))
+        self.screen.blit(title, (center_x - title.get_width() // 2, self.scaled(20)))
         
+        perspective_text = f"Viewing: Player {self.current_perspective + 1}"
+        perspective_surf = self.text_cache.render(self.small_font, perspective_text, PLAYER_COLORS[self.current_perspective % len(PLAYER_COLORS)])
+        self.screen.blit(perspective_surf, (self.scaled(50), self.scaled(70)))
+    
+    def draw_bid_panel(self, current_bid):
         self.draw_panel(self.bid_panel, "Current Bid")
-        if state['current_bid']:
-            bid_text = f"{state['current_bid'][0]} x {state['current_bid'][1]}s"
+        if current_bid:
+            bid_text = f"{current_bid[0]} x {current_bid[1]}s"
         else:
             bid_text = "No bid yet"
         
-        bid_surf = self.font.render(bid_text, True, TEXT_COLOR)
-        if bid_surf.get_width() > self.bid_panel.width - 40:
-            smaller_font = pygame.font.SysFont('Arial', self.font_size_medium)
-            bid_surf = smaller_font.render(bid_text, True, TEXT_COLOR)
+        bid_surf = self.text_cache.fit(self.font, bid_text, TEXT_COLOR, self.bid_panel.width - self.scaled(40), self.small_font)
         
         bid_x = self.bid_panel.x + (self.bid_panel.width - bid_surf.get_width()) // 2
-        bid_y = self.bid_panel.y + 40
+        bid_y = self.bid_panel.y + self.scaled(40)
         self.screen.blit(bid_surf, (bid_x, bid_y))
-        
+    
+    def draw_message_panel(self, message):
         self.draw_panel(self.message_panel, "Game Status")
-        message = state['message']
-        msg_surf = self.small_font.render(message, True, TEXT_COLOR)
-        
-        if msg_surf.get_width() > self.message_panel.width - 40:
-            smaller_font = pygame.font.SysFont('Arial', self.font_size_small)
-            msg_surf = smaller_font.render(message, True, TEXT_COLOR)
-            
-            if msg_surf.get_width() > self.message_panel.width - 40:
-                for i in range(len(message), 0, -1):
-                    truncated = message[:i] + "..."
-                    test_surf = smaller_font.render(truncated, True, TEXT_COLOR)
-                    if test_surf.get_width() <= self.message_panel.width - 40:
-                        msg_surf = test_surf
-                        break
+        msg_surf = self.text_cache.fit(self.small_font, message, TEXT_COLOR, self.message_panel.width - self.scaled(40), self.tiny_font, truncate=True)
         
         msg_x = self.message_panel.x + (self.message_panel.width - msg_surf.get_width()) // 2
-        msg_y = self.message_panel.y + 22
+        msg_y = self.message_panel.y + self.scaled(22)
         self.screen.blit(msg_surf, (msg_x, msg_y))
+    
+    def draw_challenge_panel(self, challenge_text):
+        if not challenge_text:
+            return
         
-        if state['challenge_result']:
-            self.draw_panel(self.challenge_panel, "Challenge Result")
-            challenge_text = state['challenge_result']
-            challenge_surf = self.small_font.render(challenge_text, True, (255, 215, 0))
-            
-            if challenge_surf.get_width() > self.challenge_panel.width - 40:
-                smaller_font = pygame.font.SysFont('Arial', self.font_size_small)
-                challenge_surf = smaller_font.render(challenge_text, True, (255, 215, 0))
-                
-                if challenge_surf.get_width() > self.challenge_panel.width - 40:
-                    for i in range(len(challenge_text), 0, -1):
-                        truncated = challenge_text[:i] + "..."
-                        test_surf = smaller_font.render(truncated, True, (255, 215, 0))
-                        if test_surf.get_width() <= self.challenge_panel.width - 40:
-                            challenge_surf = test_surf
-                            break
-            
-            challenge_x = self.challenge_panel.x + (self.challenge_panel.width - challenge_surf.get_width()) // 2
-            challenge_y = self.challenge_panel.y + 22
-            self.screen.blit(challenge_surf, (challenge_x, challenge_y))
+        self.draw_panel(self.challenge_panel, "Challenge Result")
+        challenge_surf = self.text_cache.fit(self.small_font, challenge_text, (255, 215, 0), self.challenge_panel.width - self.scaled(40), self.tiny_font, truncate=True)
         
+        challenge_x = self.challenge_panel.x + (self.challenge_panel.width - challenge_surf.get_width()) // 2
+        challenge_y = self.challenge_panel.y + self.scaled(22)
+        self.screen.blit(challenge_surf, (challenge_x, challenge_y))
+    
+    def draw_instructions(self):
         self.draw_panel(self.instructions_panel, "Instructions")
         instructions = [
             "View shows dice of Player 1",
@@ -500,56 +695,58 @@ class DiceGUI:
             "Switch view to see from other",
             "player's perspective",
             "",
-            "ESC: Exit game",
-            "Mouse: Click buttons"
+            "ESC: Exit game, H: Hint",
+            "Mouse: Click buttons, F3: Profiler"
         ]
         
-        y_offset = 40
+        y_offset = self.scaled(40)
         for line in instructions:
-            text = self.tiny_font.render(line, True, TEXT_COLOR)
-            if text.get_width() > self.instructions_panel.width - 40:
-                words = line.split(' ')
-                current_line = ""
-                for word in words:
-                    test_line = current_line + " " + word if current_line else word
-                    test_surf = self.tiny_font.render(test_line, True, TEXT_COLOR)
-                    if test_surf.get_width() > self.instructions_panel.width - 40:
-                        line_surf = self.tiny_font.render(current_line, True, TEXT_COLOR)
-                        self.screen.blit(line_surf, (self.instructions_panel.x + 20, self.instructions_panel.y + y_offset))
-                        y_offset += 22
-                        current_line = word
-                    else:
-                        current_line = test_line
-                if current_line:
-                    line_surf = self.tiny_font.render(current_line, True, TEXT_COLOR)
-                    self.screen.blit(line_surf, (self.instructions_panel.x + 20, self.instructions_panel.y + y_offset))
-                    y_offset += 22
-            else:
-                self.screen.blit(text, (self.instructions_panel.x + 20, self.instructions_panel.y + y_offset))
-                y_offset += 22
-        
-        mouse_pos = pygame.mouse.get_pos()
+            for wrapped_line in self.text_cache.wrap(self.tiny_font, line, self.instructions_panel.width - self.scaled(40)):
+                line_surf = self.text_cache.render(self.tiny_font, wrapped_line, TEXT_COLOR)
+                self.screen.blit(line_surf, (self.instructions_panel.x + self.scaled(20), self.instructions_panel.y + y_offset))
+                y_offset += self.scaled(22)
+    
+    def draw_status(self, state):
+        center_x = self.screen_width // 2
         
         if state['game_over']:
             self.draw_panel(self.winner_panel, "Game Over!", (255, 215, 0))
             
             win_text = f"Player {state['winner'] + 1} Wins!"
-            win_surf = self.font.render(win_text, True, (255, 215, 0))
+            win_surf = self.text_cache.render(self.font, win_text, (255, 215, 0))
             win_x = self.winner_panel.x + (self.winner_panel.width - win_surf.get_width()) // 2
-            win_y = self.winner_panel.y + 45
+            win_y = self.winner_panel.y + self.scaled(45)
             self.screen.blit(win_surf, (win_x, win_y))
-            
+        
+        elif state['round_active']:
+            if self.current_perspective != state['current_player']:
+                wait_text = f"Waiting for Player {state['current_player'] + 1}"
+                wait_surf = self.text_cache.render(self.font, wait_text, (200, 200, 200))
+                wait_x = center_x - wait_surf.get_width() // 2
+                wait_y = self.scaled(500)
+                self.screen.blit(wait_surf, (wait_x, wait_y))
+        
+        elif state['all_dice_revealed']:
+            reveal_text = "All dice revealed from challenge"
+            reveal_surf = self.text_cache.render(self.small_font, reveal_text, (255, 215, 0))
+            reveal_x = center_x - reveal_surf.get_width() // 2
+            reveal_y = self.scaled(500)
+            self.screen.blit(reveal_surf, (reveal_x, reveal_y))
+        
+        if self.perspective_locked:
+            lock_text = "Perspective locked during challenge"
+            lock_surf = self.text_cache.render(self.small_font, lock_text, (255, 100, 100))
+            lock_x = center_x - lock_surf.get_width() // 2
+            lock_y = self.scaled(450)
+            self.screen.blit(lock_surf, (lock_x, lock_y))
+    
+    def draw_controls(self, state, mouse_pos):
+        center_x = self.screen_width // 2
+        
+        if state['game_over']:
             self.draw_button(self.restart_button, "Play Again", self.restart_button.collidepoint(mouse_pos))
         
         elif state['round_active']:
-            turn_player = state['current_player'] + 1
-            if self.current_perspective == state['current_player']:
-                turn_text = f"Player {turn_player}'s Turn"
-                self.draw_button(self.turn_reminder, turn_text, False, (255, 215, 0), self.small_font)
-            else:
-                turn_text = f"Player {turn_player}'s Turn"
-                self.draw_button(self.turn_reminder, turn_text, False, (100, 100, 100), self.small_font)
-            
             if self.current_perspective == state['current_player']:
                 self.draw_bid_controls(center_x)
                 
@@ -569,50 +766,142 @@ class DiceGUI:
                 
                 self.draw_button(self.bid_button, "Make Bid", self.bid_button.collidepoint(mouse_pos))
                 self.draw_button(self.challenge_button, "Challenge!", self.challenge_button.collidepoint(mouse_pos))
-            else:
-                wait_text = f"Waiting for Player {state['current_player'] + 1}"
-                wait_surf = self.font.render(wait_text, True, (200, 200, 200))
-                wait_x = center_x - wait_surf.get_width() // 2
-                wait_y = 500
-                self.screen.blit(wait_surf, (wait_x, wait_y))
         
         else:
             self.draw_button(self.new_round_button, "Start New Round", self.new_round_button.collidepoint(mouse_pos))
-            
-            if state['all_dice_revealed']:
-                reveal_text = "All dice revealed from challenge"
-                reveal_surf = self.small_font.render(reveal_text, True, (255, 215, 0))
-                reveal_x = center_x - reveal_surf.get_width() // 2
-                reveal_y = 500
-                self.screen.blit(reveal_surf, (reveal_x, reveal_y))
-        
-        other_player = 2 - self.current_perspective
-        switch_text = f"View Player {other_player}"
-        self.draw_button(self.switch_view_button, switch_text, self.switch_view_button.collidepoint(mouse_pos) and not self.perspective_locked)
+    
+    def draw_turn_reminder(self, state):
+        if state['game_over'] or not state['round_active']:
+            return
         
-        if self.perspective_locked:
-            lock_text = "Perspective locked during challenge"
-            lock_surf = self.small_font.render(lock_text, True, (255, 100, 100))
-            lock_x = center_x - lock_surf.get_width() // 2
-            lock_y = 450
-            self.screen.blit(lock_surf, (lock_x, lock_y))
+        turn_text = f"Player {state['current_player'] + 1}'s Turn"
+        if self.current_perspective == state['current_player']:
+            self.draw_button(self.turn_reminder, turn_text, False, (255, 215, 0), self.small_font)
+        else:
+            self.draw_button(self.turn_reminder, turn_text, False, (100, 100, 100), self.small_font)
+    
+    def draw_switch_button(self, hover):
+        other_player = (self.current_perspective + 1) % self.num_players + 1
+        switch_text = f"View Player {other_player}"
+        self.draw_button(self.switch_view_button, switch_text, hover)
+    
+    def controls_key(self, state, mouse_pos):
+        if state['game_over']:
+            return ('game_over', self.restart_button.collidepoint(mouse_pos))
+        if not state['round_active']:
+            return ('round_over', self.new_round_button.collidepoint(mouse_pos))
+        if self.current_perspective != state['current_player']:
+            return ('waiting',)
+        
+        hovered = tuple(btn.collidepoint(mouse_pos) for btn in [self.quantity_down, self.quantity_up, self.bid_button, self.challenge_button] + self.face_buttons)
+        return ('bidding', self.current_perspective, self.selected_quantity, self.selected_face, hovered)
+    
+    def draw(self):
+        state = self.current_view()
+        mouse_pos = pygame.mouse.get_pos()
         
-        pygame.display.flip()
+        self.layers_changed = self.needs_full_redraw
+        if self.needs_full_redraw or not self.retained:
+            self.screen.fill(BACKGROUND)
+            for layer in self.layers.values():
+                layer.valid = False
+        
+        status_key = (state['game_over'], state['winner'], state['round_active'], state['current_player'], self.current_perspective, state['all_dice_revealed'], self.perspective_locked)
+        turn_key = (state['game_over'], state['round_active'], state['current_player'], self.current_perspective == state['current_player'])
+        switch_hover = self.switch_view_button.collidepoint(mouse_pos) and not self.perspective_locked
+        
+        self.update_layer('header', self.current_perspective, self.draw_header)
+        for i, panel in enumerate(self.player_panels):
+            visible = state['visible_dice'][i]
+            is_hidden = (visible[0] == '?') if visible else False
+            is_current_turn = state['current_player'] == i
+            player_key = (tuple(visible), is_hidden, is_current_turn)
+            self.update_layer(f'player{i + 1}', player_key, self.draw_player_panel, panel, i, visible, state['player_counts'][i], is_hidden, is_current_turn)
+        self.update_layer('bid', state['current_bid'], self.draw_bid_panel, state['current_bid'])
+        message = self.hint if self.hint and self.hint_version == self.game.version else state['message']
+        self.update_layer('message', message, self.draw_message_panel, message)
+        self.update_layer('challenge', state['challenge_result'], self.draw_challenge_panel, state['challenge_result'])
+        self.update_layer('instructions', True, self.draw_instructions)
+        self.update_layer('status', status_key, self.draw_status, state)
+        self.update_layer('controls', self.controls_key(state, mouse_pos), self.draw_controls, state, mouse_pos)
+        self.update_layer('turn', turn_key, self.draw_turn_reminder, state)
+        self.update_layer('switch', (self.current_perspective, switch_hover), self.draw_switch_button, switch_hover)
+        
+        if self.profiler_overlay and (self.dirty_rects or self.needs_full_redraw or not self.retained):
+            self.draw_profiler()
+        self.present()
     
-    def run(self):
+    def present(self):
+        if self.needs_full_redraw or not self.retained:
+            pygame.display.flip()
+            self.needs_full_redraw = False
+            self.frame_changed = self.layers_changed
+        else:
+            if self.dirty_rects:
+                pygame.display.update(self.dirty_rects)
+            self.frame_changed = bool(self.dirty_rects)
+        self.dirty_rects = []
+    
+    def draw_profiler(self):
+        # Redrawn only on frames that changed something else, so an idle
+        # event-driven loop stays idle with the overlay up. It covers the
+        # instructions, which end above the right-hand player panels.
+        names = list(self.profiler.index)
+        s = self.scaled
+        rect = pygame.Rect(self.instructions_panel.x, self.instructions_panel.y, self.instructions_panel.width, s(40 + 20 * len(names)))
+        pygame.draw.rect(self.screen, (0, 0, 0), rect)
+        pygame.draw.rect(self.screen, (100, 100, 120), rect, 1)
+        
+        font = self.tiny_font
+        columns = (rect.x + s(10), rect.x + s(130), rect.x + s(200), rect.x + s(270))
+        for x, text in zip(columns, ("ms", "p50", "p95", "p99")):
+            self.screen.blit(self.text_cache.render(font, text, (255, 215, 0)), (x, rect.y + s(8)))
+        
+        stats = self.profiler.percentiles()
+        for i, name in enumerate(names):
+            y = rect.y + s(32 + 20 * i)
+            self.screen.blit(self.text_cache.render(font, name, TEXT_COLOR), (columns[0], y))
+            for x, value in zip(columns[1:], stats[:, i]):
+                self.screen.blit(self.text_cache.render(font, f"{value:.2f}", TEXT_COLOR), (x, y))
+        
+        if self.retained and not self.needs_full_redraw:
+            self.dirty_rects.append(rect)
+    
+    def run(self, event_driven=True, fps=60, idle_timeout=1000):
         self.game.start_new_round()
-        self.current_perspective = self.game.current_player
-        
-        running = True
-        while running:
+        self.current_perspective = self.viewer_for(self.game.current_player)
+        if self.is_bot(self.current_perspective):
+            self.current_perspective = next((i for i in range(self.num_players) if not self.is_bot(i)), self.current_perspective)
+        
+        self.loop(event_driven, fps, idle_timeout)
+        if self.bot_runner:
+            self.bot_runner.close()
+        if self.profiler:
+            self.profiler.detach()
+        pygame.quit()
+    
+    def loop(self, event_driven=True, fps=60, idle_timeout=1000):
+        self.running = True
+        while self.running:
+            if event_driven and not self.frame_changed:
+                self.wait_for_event(idle_timeout)
             self.handle_events()
+            self.update_bots()
             self.draw()
-            self.clock.tick(60)
-        
-        pygame.quit()
+            self.clock.tick(fps)
+            if self.profiler:
+                self.profiler.end_frame()
 
 def main():
-    gui = DiceGUI()
+    num_players = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    num_bots = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    
+    bots = None
+    if num_bots:
+        from random import Random
+        from bots import MonteCarloBot
+        bots = {seat: MonteCarloBot(Random()) for seat in range(num_players - num_bots, num_players)}
+    gui = DiceGUI(num_players, bots=bots)
     gui.run()
 
 if __name__ == "__main__":
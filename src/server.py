@@ -0,0 +1,256 @@
+import json
+import struct
+import asyncio
+import argparse
+import itertools
+
+from engine import GamePool
+from dicerng import SecureRNG
+
+HEADER = struct.Struct('>I')
+MAX_MESSAGE = 64 * 1024
+
+
+def encode(message):
+    data = json.dumps(message, separators=(',', ':')).encode()
+    return HEADER.pack(len(data)) + data
+
+
+async def read_message(reader):
+    header = await reader.readexactly(HEADER.size)
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE:
+        raise ValueError(f"message of {length} bytes is too large")
+    return json.loads(await reader.readexactly(length))
+
+
+class Table:
+    def __init__(self, table_id, game, restored=False):
+        self.table_id = table_id
+        self.game = game
+        self.seats = []
+        self.spectators = []
+        self.versions = {}
+        self.started = False
+        self.closed = False
+        self.restored = restored
+        if restored:
+            # Play resumes as the players rejoin.
+            self.seats = [None] * game.num_players
+            self.started = True
+
+    def full(self):
+        return len(self.seats) == self.game.num_players and None not in self.seats
+
+    def watchers(self):
+        for seat, writer in enumerate(self.seats):
+            if writer is not None:
+                yield seat, writer
+        for writer in self.spectators:
+            yield None, writer
+
+    def send_changes(self, perspective, writer):
+        # Each connection only gets what changed since the version it last saw;
+        # the first message carries the whole public view.
+        since = self.versions.get(writer, -1)
+        if since == self.game.version:
+            return
+        version, changes = self.game.get_view_diff(perspective, since)
+        self.versions[writer] = version
+        writer.write(encode({'type': 'delta', 'table': self.table_id, 'version': version, 'changes': changes}))
+
+    def broadcast(self):
+        for perspective, writer in self.watchers():
+            self.send_changes(perspective, writer)
+
+    def start(self):
+        self.started = True
+        self.game.start_new_round()
+        self.broadcast()
+
+    def apply(self, seat, message):
+        game = self.game
+        action = message.get('type')
+        if action == 'bid':
+            try:
+                quantity = int(message['quantity'])
+                face = int(message['face'])
+            except (KeyError, TypeError, ValueError):
+                return "bid needs integer quantity and face"
+            played = game.make_bid(seat, quantity, face)
+        elif action == 'challenge':
+            played = game.challenge(seat)
+        else:
+            return f"unknown action {action!r}"
+
+        if not played:
+            return "action not allowed now"
+
+        self.broadcast()
+        if not game.round_active:
+            # Rounds restart straight away; the revealed view has already gone out.
+            game.start_new_round()
+            self.broadcast()
+        return None
+
+    def close(self, leaving):
+        self.closed = True
+        for _, writer in self.watchers():
+            if writer is not leaving:
+                writer.write(encode({'type': 'closed', 'table': self.table_id}))
+
+
+class GameServer:
+    def __init__(self, num_players=2, secure=False, stats=None, snapshot=None, snapshot_every=1.0):
+        self.num_players = num_players
+        # Tables that matter draw every roll from the OS CSPRNG.
+        self.rng = SecureRNG() if secure else None
+        self.stats = stats
+        # Tables come and go all the time, so their games are reused.
+        self.games = GamePool(self.rng, stats)
+        self.tables = {}
+        self.waiting = None
+        self.table_ids = itertools.count(1)
+        self.snapshotter = None
+        self.snapshot_every = snapshot_every
+        if snapshot:
+            self.restore(snapshot)
+
+    def restore(self, path):
+        from snapshot import Snapshotter, load_snapshot
+
+        # Restored games do not feed the stats recorder, which never saw them
+        # start, so they are not handed back to the pool either.
+        for table_id, game in load_snapshot(path, self.rng).items():
+            self.tables[table_id] = Table(table_id, game, restored=True)
+        self.table_ids = itertools.count(max(self.tables, default=0) + 1)
+        self.snapshotter = Snapshotter(path)
+
+    def live_games(self):
+        return {table_id: table.game for table_id, table in self.tables.items() if table.started and not table.closed}
+
+    def seat(self, writer):
+        if self.waiting is None:
+            table_id = next(self.table_ids)
+            self.waiting = Table(table_id, self.games.acquire(self.num_players))
+            self.tables[table_id] = self.waiting
+
+        table = self.waiting
+        table.seats.append(writer)
+        seat = len(table.seats) - 1
+        writer.write(encode({'type': 'joined', 'table': table.table_id, 'seat': seat}))
+
+        if table.full():
+            self.waiting = None
+            table.start()
+        return table, seat
+
+    def rejoin(self, writer, table_id, seat):
+        # Takes back a seat at a table restored from a snapshot.
+        table = self.tables.get(table_id) if isinstance(table_id, int) else None
+        if table is None or table.closed or not isinstance(seat, int) or not 0 <= seat < len(table.seats) or table.seats[seat] is not None:
+            writer.write(encode({'type': 'error', 'message': f"no free seat {seat} at table {table_id}"}))
+            return None, None
+        table.seats[seat] = writer
+        writer.write(encode({'type': 'joined', 'table': table_id, 'seat': seat}))
+        table.send_changes(seat, writer)
+        return table, seat
+
+    def spectate(self, writer, table_id):
+        table = self.tables.get(table_id) if isinstance(table_id, int) else None
+        if table is None or table.closed:
+            writer.write(encode({'type': 'error', 'message': f"no running table {table_id}"}))
+            return None
+        table.spectators.append(writer)
+        # Spectators see the table as it is now, even while it fills up.
+        table.send_changes(None, writer)
+        return table
+
+    async def handle_client(self, reader, writer):
+        table = None
+        seat = None
+        try:
+            while True:
+                message = await read_message(reader)
+                if not isinstance(message, dict):
+                    writer.write(encode({'type': 'error', 'message': "messages must be JSON objects"}))
+                    await writer.drain()
+                    continue
+                if message.get('type') == 'join':
+                    if table is None or table.closed:
+                        if 'table' in message:
+                            table, seat = self.rejoin(writer, message['table'], message.get('seat'))
+                        else:
+                            table, seat = self.seat(writer)
+                    continue
+                if message.get('type') == 'spectate':
+                    if table is None or table.closed:
+                        table = self.spectate(writer, message.get('table'))
+                    continue
+
+                if table is None or table.closed or not table.full() or seat is None:
+                    error = "not seated at a running table"
+                else:
+                    error = table.apply(seat, message)
+                if error:
+                    writer.write(encode({'type': 'error', 'message': error}))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if table is not None and seat is None:
+                if writer in table.spectators:
+                    table.spectators.remove(writer)
+                table.versions.pop(writer, None)
+            elif table is not None and not table.closed:
+                if table is self.waiting:
+                    self.waiting = None
+                table.close(writer)
+                self.tables.pop(table.table_id, None)
+                if not table.restored:
+                    self.games.release(table.game)
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_client, host, port, backlog=4096)
+        if self.snapshotter is not None:
+            asyncio.get_running_loop().create_task(self.snapshot_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self.snapshotter is not None:
+                self.snapshotter.capture(self.live_games())
+                self.snapshotter.close()
+            if self.stats is not None:
+                self.stats.close()
+
+    async def snapshot_loop(self):
+        # Encoding happens here between messages, so every game is caught
+        # between actions; the disk work is on the snapshotter's thread.
+        while True:
+            await asyncio.sleep(self.snapshot_every)
+            self.snapshotter.capture(self.live_games())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Liar's Dice table server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--players', type=int, default=2, help="players per table")
+    parser.add_argument('--secure-dice', action='store_true', help="roll with the OS CSPRNG instead of Python's random")
+    parser.add_argument('--stats', help="directory to record game outcomes into")
+    parser.add_argument('--snapshot', help="file to keep running tables in, restored from on startup")
+    parser.add_argument('--snapshot-every', type=float, default=1.0, help="seconds between snapshots")
+    args = parser.parse_args(argv)
+
+    stats = None
+    if args.stats:
+        from stats import StatsRecorder
+
+        stats = StatsRecorder(args.stats)
+    asyncio.run(GameServer(args.players, args.secure_dice, stats, args.snapshot, args.snapshot_every).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import gc
+import os
+import sys
+import time
+import zlib
+import random
+import struct
+import argparse
+import tempfile
+import threading
+
+from engine import DiceSet, LiarsDiceGame
+
+# A snapshot file is a header followed by one record per table:
+#   header: magic, format version, table count, CRC32 of everything after it
+#   table:  fixed fields, then dice counts, dice, message and challenge text
+# Each die is one byte, its face with the held flag in bit 3.
+FILE_HEADER = struct.Struct('<4sHII')
+TABLE_HEADER = struct.Struct('<IIBBBBBBBBHH')
+MAGIC = b'LDSS'
+FORMAT_VERSION = 1
+NONE = 255
+HELD = 8
+FACE_BYTES = bytes(range(1, 7))
+
+ROUND_ACTIVE = 1
+GAME_OVER = 2
+REVEALED = 4
+
+
+def encode_game(table_id, game):
+    flags = (ROUND_ACTIVE if game.round_active else 0) | (GAME_OVER if game.game_over else 0) | (REVEALED if game.all_dice_revealed else 0)
+    quantity, face_value = game.current_bid or (0, 0)
+    message = game.message.encode()
+    result = game.challenge_result.encode()
+    dice = b''.join(
+        bytes(value | HELD * held for value, held in zip(player.values, player.held)) if any(player.held) else player.values.tobytes()
+        for player in game.players
+    )
+    return b''.join((
+        TABLE_HEADER.pack(table_id, game.version, game.num_players, game.num_dice, game.current_player,
+                          NONE if game.last_bidder is None else game.last_bidder, quantity, face_value, flags,
+                          NONE if game.winner is None else game.winner, len(message), len(result)),
+        game.dice_counts.tobytes(), dice, message, result,
+    ))
+
+
+def restore_game(fields, counts, dice, message, result, rng=None):
+    # The game as it was, without the dice rolls __init__ would make. A log
+    # never saw it start, so none is attached.
+    (_, version, num_players, num_dice, current_player, last_bidder, quantity, face_value, flags, winner, _, _) = fields
+    rng = rng or random
+    any_held = bool(dice.translate(None, FACE_BYTES))
+    players = []
+    start = 0
+    for count in counts:
+        values = dice[start:start + count]
+        held = None
+        if any_held:
+            held = bytes(value >> 3 for value in values)
+            values = bytes(value & ~HELD for value in values)
+        players.append(DiceSet.from_values(values, held, rng))
+        start += count
+    return LiarsDiceGame.from_state(
+        num_dice, players, current_player,
+        current_bid=(quantity, face_value) if face_value else None,
+        last_bidder=None if last_bidder == NONE else last_bidder,
+        round_active=bool(flags & ROUND_ACTIVE),
+        message=message,
+        game_over=bool(flags & GAME_OVER),
+        winner=None if winner == NONE else winner,
+        all_dice_revealed=bool(flags & REVEALED),
+        challenge_result=result,
+        version=version,
+        rng=rng,
+    )
+
+
+def encode_snapshot(records):
+    body = b''.join(records)
+    return FILE_HEADER.pack(MAGIC, FORMAT_VERSION, len(records), zlib.crc32(body)) + body
+
+
+def decode_snapshot(data, rng=None):
+    # Returns {table_id: game} for every table in the snapshot.
+    magic, version, count, crc = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a table snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot format {version}")
+    data = data[FILE_HEADER.size:]
+    if zlib.crc32(data) != crc:
+        raise ValueError("snapshot is corrupt")
+
+    # Nothing built here can be garbage yet, so collecting while hundreds of
+    # thousands of objects appear would only slow the restore down.
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        games = decode_tables(data, count, rng)
+    finally:
+        if collecting:
+            gc.enable()
+    return games
+
+
+def decode_tables(data, count, rng):
+    games = {}
+    unpack = TABLE_HEADER.unpack_from
+    size = TABLE_HEADER.size
+    pos = 0
+    for _ in range(count):
+        fields = unpack(data, pos)
+        pos += size
+        num_players = fields[2]
+        counts = data[pos:pos + num_players]
+        pos += num_players
+        total = sum(counts)
+        dice = data[pos:pos + total]
+        pos += total
+        message = data[pos:pos + fields[10]].decode()
+        pos += fields[10]
+        result = data[pos:pos + fields[11]].decode()
+        pos += fields[11]
+        games[fields[0]] = restore_game(fields, counts, dice, message, result, rng)
+    return games
+
+
+def write_snapshot(path, records):
+    # Readers only ever see a complete file: write aside, sync, rename over,
+    # then sync the directory so the rename itself survives a crash.
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(encode_snapshot(records))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def load_snapshot(path, rng=None):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'rb') as f:
+        return decode_snapshot(f.read(), rng)
+
+
+class Snapshotter:
+    # Keeps the encoded record of every table and re-encodes only the ones
+    # whose version moved, on the caller's thread so it sees a consistent
+    # game. Writing and syncing happen on a background thread; if captures
+    # come faster than the disk, the newest one replaces the one waiting.
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.pending = None
+        self.writing = False
+        self.closed = False
+        self.snapshots = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def capture(self, games):
+        # games: {table_id: game}. Returns how many tables were re-encoded.
+        records = self.records
+        encoded = 0
+        for table_id, game in games.items():
+            cached = records.get(table_id)
+            if cached is None or cached[0] is not game or cached[1] != game.version:
+                records[table_id] = (game, game.version, encode_game(table_id, game))
+                encoded += 1
+        if len(records) > len(games):
+            for table_id in [table_id for table_id in records if table_id not in games]:
+                del records[table_id]
+        snapshot = [record for _, _, record in records.values()]
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify()
+        return encoded
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                snapshot = self.pending
+                self.pending = None
+                self.writing = True
+            write_snapshot(self.path, snapshot)
+            with self.condition:
+                self.writing = False
+                self.snapshots += 1
+                self.condition.notify_all()
+
+    def wait(self):
+        # Blocks until every capture so far is on disk.
+        with self.condition:
+            while self.pending is not None or self.writing:
+                self.condition.wait()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+
+def game_state(game):
+    return (game.num_players, game.num_dice, game.current_player, game.last_bidder, game.current_bid,
+            tuple(game.dice_counts), tuple(tuple(p.values) for p in game.players), tuple(tuple(p.held) for p in game.players),
+            game.round_active, game.message, game.game_over, game.winner, game.all_dice_revealed,
+            game.challenge_result, game.version)
+
+
+def make_tables(count, seed=0):
+    # Tables at every stage of play: some fresh, some mid-round, some over.
+    rng = random.Random(seed)
+    games = {}
+    for table_id in range(1, count + 1):
+        game = LiarsDiceGame(rng.randint(2, 4), rng=rng)
+        game.start_new_round()
+        for _ in range(rng.randint(0, 40)):
+            if game.game_over:
+                break
+            if not game.round_active:
+                game.start_new_round()
+            elif game.current_bid is None or rng.random() < 0.7:
+                quantity, face_value = game.current_bid or (1, 1)
+                if not game.make_bid(game.current_player, quantity + (face_value == 6), face_value % 6 + 1):
+                    game.challenge(game.current_player)
+            else:
+                game.challenge(game.current_player)
+        if rng.random() < 0.01 and game.players[0].size():
+            game.players[0].hold(0)
+        games[table_id] = game
+    return games
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot and restore many live tables")
+    parser.add_argument('--tables', type=int, default=100_000)
+    parser.add_argument('--changed', type=float, default=0.01, help="share of tables that move between snapshots")
+    parser.add_argument('--path', help="snapshot file (default: a temporary one)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'tables.snap')
+    games = make_tables(args.tables, args.seed)
+    snapshotter = Snapshotter(path)
+
+    start = time.perf_counter()
+    snapshotter.capture(games)
+    captured = time.perf_counter() - start
+    snapshotter.wait()
+    written = time.perf_counter() - start
+    print(f"First capture of {len(games):,} tables: {captured * 1000:.0f} ms on the caller, on disk after {written * 1000:.0f} ms, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB ({os.path.getsize(path) / len(games):.0f} bytes/table)")
+
+    rng = random.Random(args.seed + 1)
+    for game in rng.sample(list(games.values()), int(len(games) * args.changed)):
+        if game.round_active:
+            game.challenge(game.current_player) or game.make_bid(game.current_player, 1, 2)
+        else:
+            game.start_new_round()
+    start = time.perf_counter()
+    encoded = snapshotter.capture(games)
+    captured = time.perf_counter() - start
+    snapshotter.wait()
+    written = time.perf_counter() - start
+    snapshotter.close()
+    print(f"Capture after {encoded:,} tables moved: {captured * 1000:.1f} ms on the caller, on disk after {written * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    restored = load_snapshot(path)
+    elapsed = time.perf_counter() - start
+    mismatches = sum(game_state(restored.get(table_id, game)) != game_state(game) or table_id not in restored
+                     for table_id, game in games.items())
+    print(f"Restored {len(restored):,} tables in {elapsed:.2f}s ({len(restored) / elapsed:,.0f} tables/sec), {mismatches} mismatches")
+
+    # A restored game has to keep playing like the original.
+    for table_id in list(games)[:1000]:
+        for game in (games[table_id], restored[table_id]):
+            game.rng = random.Random(table_id)
+            for player in game.players:
+                player.rng = game.rng
+            for _ in range(20):
+                if game.game_over:
+                    break
+                if not game.round_active:
+                    game.start_new_round()
+                elif not game.make_bid(game.current_player, 1, 6) and not game.challenge(game.current_player):
+                    game.make_bid(game.current_player, 2, 6)
+        if game_state(games[table_id]) != game_state(restored[table_id]):
+            mismatches += 1
+    print(f"Played on 1,000 restored tables: {mismatches} mismatches in total")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
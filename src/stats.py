@@ -0,0 +1,290 @@
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+import tempfile
+from array import array
+
+import numpy as np
+
+from engine import LiarsDiceGame, MAX_PLAYERS
+
+# Append-only columns, by table. Rows are kept in typed arrays and written
+# out a chunk at a time; a chunk file holds every table as '<table>.<column>'.
+TABLES = {
+    'bids': (('game', 'I'), ('round', 'I'), ('player', 'B'), ('quantity', 'B'), ('face', 'B'), ('matching', 'B')),
+    'challenges': (('game', 'I'), ('round', 'I'), ('challenger', 'B'), ('bidder', 'B'), ('quantity', 'B'),
+                   ('face', 'B'), ('matching', 'B'), ('loser', 'B'), ('total_dice', 'B')),
+    'games': (('game', 'I'), ('players', 'B'), ('dice', 'B'), ('first', 'B'), ('winner', 'B'), ('rounds', 'I')),
+}
+
+# Running totals, updated as events arrive, so a dashboard reads these
+# instead of scanning the chunks. Indexed by face, bid quantity or the
+# number of players.
+AGGREGATES = {
+    'bids_by_face': 7,
+    'bluffs_by_face': 7,
+    'challenges_by_quantity': 256,
+    'successes_by_quantity': 256,
+    'games_by_players': MAX_PLAYERS + 1,
+    'first_player_wins': MAX_PLAYERS + 1,
+}
+
+CHUNK_PATTERN = 'chunk-{:06d}.npz'
+AGGREGATES_FILE = 'aggregates.npz'
+
+
+class Aggregates:
+    def __init__(self):
+        self.counts = {name: array('Q', bytes(8 * size)) for name, size in AGGREGATES.items()}
+        self.rounds = 0
+        self.next_game = 1
+
+    def bluff_rate(self):
+        # Share of bids on each face that the dice on the table did not cover.
+        bids = self.counts['bids_by_face']
+        bluffs = self.counts['bluffs_by_face']
+        return {face: bluffs[face] / bids[face] for face in range(1, 7) if bids[face]}
+
+    def challenge_success(self):
+        challenges = self.counts['challenges_by_quantity']
+        successes = self.counts['successes_by_quantity']
+        return {q: successes[q] / challenges[q] for q in range(len(challenges)) if challenges[q]}
+
+    def first_player_advantage(self):
+        # How much more often the player who opens a game wins it than a
+        # random seat would, by table size.
+        games = self.counts['games_by_players']
+        wins = self.counts['first_player_wins']
+        return {n: wins[n] / games[n] - 1 / n for n in range(2, len(games)) if games[n]}
+
+    def summary(self):
+        counts = self.counts
+        return {
+            'games': sum(counts['games_by_players']),
+            'rounds': self.rounds,
+            'bids': sum(counts['bids_by_face']),
+            'challenges': sum(counts['challenges_by_quantity']),
+            'bluff_rate_by_face': {face: round(rate, 4) for face, rate in self.bluff_rate().items()},
+            'challenge_success_by_quantity': {q: round(rate, 4) for q, rate in self.challenge_success().items()},
+            'first_player_advantage': {n: round(edge, 4) for n, edge in self.first_player_advantage().items()},
+        }
+
+    def save(self, path):
+        # Written next to the chunks and swapped in whole, so a reader never
+        # sees totals that disagree with the chunks on disk.
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, rounds=np.uint64(self.rounds), next_game=np.uint64(self.next_game),
+                     **{name: np.frombuffer(values, dtype=np.uint64) for name, values in self.counts.items()})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        aggregates = cls()
+        if os.path.exists(path):
+            with np.load(path) as data:
+                aggregates.rounds = int(data['rounds'])
+                aggregates.next_game = int(data['next_game'])
+                for name in AGGREGATES:
+                    aggregates.counts[name] = array('Q', data[name].astype(np.uint64).tobytes())
+        return aggregates
+
+
+class StatsRecorder:
+    # Collects outcomes through the same hooks as GameLog: pass it as
+    # LiarsDiceGame(log=...). Opening an existing directory carries on
+    # from its saved totals.
+    def __init__(self, path, chunk_rows=1 << 16):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        os.makedirs(path, exist_ok=True)
+        self.aggregates = Aggregates.load(os.path.join(path, AGGREGATES_FILE))
+        self.next_chunk = len(glob.glob(os.path.join(path, 'chunk-*.npz')))
+        self.columns = {table: {name: array(code) for name, code in columns} for table, columns in TABLES.items()}
+        self.bids = self.columns['bids']
+        self.challenges = self.columns['challenges']
+        self.games = self.columns['games']
+
+    def log_new_game(self, game):
+        # A new game comes with its first round already dealt.
+        game.stats_game = self.aggregates.next_game
+        game.stats_round = 1
+        game.stats_first = game.current_player
+        game.stats_bids = 0
+        self.aggregates.next_game += 1
+
+    def log_rolls(self, game):
+        pass
+
+    def log_round(self, game):
+        if game.stats_round == 1 and not game.stats_bids:
+            # The first round was dealt again before anyone bid.
+            game.stats_first = game.current_player
+        else:
+            game.stats_round += 1
+
+    def log_bid(self, game, player, quantity, face_value):
+        matching = 0
+        for dice in game.players:
+            matching += dice.count_matching(face_value)
+        bids = self.bids
+        bids['game'].append(game.stats_game)
+        bids['round'].append(game.stats_round)
+        bids['player'].append(player)
+        bids['quantity'].append(quantity)
+        bids['face'].append(face_value)
+        bids['matching'].append(matching)
+        game.stats_bid = (quantity, face_value)
+        game.stats_bidder = player
+        game.stats_bids += 1
+        counts = self.aggregates.counts
+        counts['bids_by_face'][face_value] += 1
+        if matching < quantity:
+            counts['bluffs_by_face'][face_value] += 1
+        if len(bids['game']) >= self.chunk_rows:
+            self.flush()
+
+    def log_challenge(self, game, player, loser, total_count):
+        # challenge() has cleared the bid by now, so use the one log_bid saw.
+        quantity, face_value = game.stats_bid
+        challenges = self.challenges
+        challenges['game'].append(game.stats_game)
+        challenges['round'].append(game.stats_round)
+        challenges['challenger'].append(player)
+        challenges['bidder'].append(game.stats_bidder)
+        challenges['quantity'].append(quantity)
+        challenges['face'].append(face_value)
+        challenges['matching'].append(total_count)
+        challenges['loser'].append(loser)
+        challenges['total_dice'].append(game.total_dice() + 1)
+        self.aggregates.rounds += 1
+        counts = self.aggregates.counts
+        counts['challenges_by_quantity'][quantity] += 1
+        if loser != player:
+            counts['successes_by_quantity'][quantity] += 1
+
+        if game.game_over:
+            games = self.games
+            games['game'].append(game.stats_game)
+            games['players'].append(game.num_players)
+            games['dice'].append(game.num_dice)
+            games['first'].append(game.stats_first)
+            games['winner'].append(game.winner)
+            games['rounds'].append(game.stats_round)
+            counts['games_by_players'][game.num_players] += 1
+            if game.winner == game.stats_first:
+                counts['first_player_wins'][game.num_players] += 1
+
+    def flush(self):
+        if not any(len(columns[name]) for columns in self.columns.values() for name in columns):
+            return
+        chunk = {}
+        for table, columns in self.columns.items():
+            for name, values in columns.items():
+                chunk[f'{table}.{name}'] = np.frombuffer(values, dtype=values.typecode) if len(values) else np.zeros(0, values.typecode)
+        path = os.path.join(self.path, CHUNK_PATTERN.format(self.next_chunk))
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **chunk)
+        os.replace(path + '.tmp', path)
+        self.next_chunk += 1
+        for columns in self.columns.values():
+            for name, values in columns.items():
+                columns[name] = array(values.typecode)
+        self.bids = self.columns['bids']
+        self.challenges = self.columns['challenges']
+        self.games = self.columns['games']
+        self.aggregates.save(os.path.join(self.path, AGGREGATES_FILE))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StatsReader:
+    def __init__(self, path):
+        self.path = path
+        self.aggregates = Aggregates.load(os.path.join(path, AGGREGATES_FILE))
+        self.chunks = sorted(glob.glob(os.path.join(path, 'chunk-*.npz')))
+
+    def table(self, name):
+        # Every chunk's rows of one table, as a dict of NumPy columns.
+        parts = {column: [] for column, _ in TABLES[name]}
+        for chunk in self.chunks:
+            with np.load(chunk) as data:
+                for column in parts:
+                    parts[column].append(data[f'{name}.{column}'])
+        return {column: np.concatenate(values) if values else np.zeros(0, code)
+                for (column, code), values in zip(TABLES[name], parts.values())}
+
+    def rescan(self):
+        # The totals rebuilt from the raw rows, to check the running ones.
+        bids = self.table('bids')
+        challenges = self.table('challenges')
+        games = self.table('games')
+        success = challenges['loser'] != challenges['challenger']
+        first_won = games['winner'] == games['first']
+        return {
+            'bids_by_face': np.bincount(bids['face'], minlength=7),
+            'bluffs_by_face': np.bincount(bids['face'][bids['matching'] < bids['quantity']], minlength=7),
+            'challenges_by_quantity': np.bincount(challenges['quantity'], minlength=256),
+            'successes_by_quantity': np.bincount(challenges['quantity'][success], minlength=256),
+            'games_by_players': np.bincount(games['players'], minlength=MAX_PLAYERS + 1),
+            'first_player_wins': np.bincount(games['players'][first_won], minlength=MAX_PLAYERS + 1),
+        }
+
+
+def simulate(recorder, num_games, num_players=2, seed=0):
+    from bots import make_bot
+    from tournament import play_game
+
+    rng = random.Random(seed)
+    bots = [make_bot('probability', random.Random(seed + i)) for i in range(num_players)]
+    game = LiarsDiceGame(num_players, rng=rng, log=recorder)
+    for _ in range(num_games):
+        play_game(bots, rng, game=game)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record game outcomes into chunked columns with running totals")
+    parser.add_argument('--games', type=int, default=5000)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--chunk-rows', type=int, default=1 << 16)
+    parser.add_argument('--path', help="stats directory to append to (default: a temporary one)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    path = args.path or tempfile.mkdtemp()
+    start = time.perf_counter()
+    with StatsRecorder(path, args.chunk_rows) as recorder:
+        simulate(recorder, args.games, args.players, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Played and recorded {args.games} games in {elapsed:.2f}s into {path}")
+
+    reader = StatsReader(path)
+    start = time.perf_counter()
+    summary = reader.aggregates.summary()
+    elapsed = time.perf_counter() - start
+    print(f"Read running totals in {elapsed * 1000:.2f} ms:")
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+
+    start = time.perf_counter()
+    rescanned = reader.rescan()
+    elapsed = time.perf_counter() - start
+    mismatches = [name for name, values in rescanned.items()
+                  if not np.array_equal(values, np.frombuffer(reader.aggregates.counts[name], dtype=np.uint64))]
+    print(f"Rescanned {len(reader.chunks)} chunk(s) in {elapsed * 1000:.1f} ms, {len(mismatches)} mismatched totals")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import math
+import time
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import LiarsDiceGame
+from bots import BOTS, make_bot
+
+
+def play_game(bots, rng, num_dice=5, game=None, log=None):
+    # A game passed in is played from its current state, e.g. fresh from
+    # reset(), or started over if it is finished. A new one reports to log.
+    if game is None:
+        game = LiarsDiceGame(len(bots), num_dice, rng=rng, log=log)
+    game.start_new_round()
+
+    while not game.game_over:
+        if not game.round_active:
+            game.start_new_round()
+            continue
+
+        player = game.current_player
+        action = bots[player].choose_action(game.get_player_view(player))
+        if action[0] == 'challenge':
+            played = game.challenge(player)
+        else:
+            played = game.make_bid(player, action[1], action[2])
+
+        # An illegal action forfeits the turn to a challenge, or an opening bid.
+        if not played and not game.challenge(player):
+            game.make_bid(player, 1, 2)
+
+    return game.winner
+
+
+def play_matchup(names, seed, num_games, num_dice=5):
+    rng = random.Random(seed)
+    bots = [make_bot(name, random.Random(f"{seed}:bot{i}")) for i, name in enumerate(names)]
+    wins = [0] * len(names)
+    game = None
+    for _ in range(num_games):
+        if game is None:
+            game = LiarsDiceGame(len(names), num_dice, rng=rng)
+        else:
+            game.reset()
+        wins[play_game(bots, rng, num_dice, game)] += 1
+    return names, wins
+
+
+def schedule(names, games_per_matchup, chunk_size, seed):
+    # Every ordered pair plays, so each bot gets both seats. Seeds depend only
+    # on the task, never on which worker runs it, so results are reproducible.
+    tasks = []
+    for a, b in itertools.permutations(names, 2):
+        for chunk, start in enumerate(range(0, games_per_matchup, chunk_size)):
+            num_games = min(chunk_size, games_per_matchup - start)
+            tasks.append(((a, b), f"{seed}:{a}:{b}:{chunk}", num_games))
+    return tasks
+
+
+def wilson_interval(wins, games, z=1.96):
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    denom = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denom
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denom
+    return center - margin, center + margin
+
+
+class Results:
+    def __init__(self, names):
+        self.wins = {name: 0 for name in names}
+        self.games = {name: 0 for name in names}
+        self.pair_wins = {}
+        self.pair_games = {}
+
+    def add(self, names, wins):
+        total = sum(wins)
+        for name, won in zip(names, wins):
+            self.wins[name] += won
+            self.games[name] += total
+        a, b = sorted(set(names))
+        self.pair_games[(a, b)] = self.pair_games.get((a, b), 0) + total
+        self.pair_wins[(a, b)] = self.pair_wins.get((a, b), 0) + sum(w for n, w in zip(names, wins) if n == a)
+
+    def total_games(self):
+        return sum(self.pair_games.values())
+
+    def report(self):
+        print(f"{'bot':<12} {'games':>8} {'win rate':>9}   95% CI")
+        for name in sorted(self.wins, key=lambda n: self.wins[n] / max(self.games[n], 1), reverse=True):
+            games = self.games[name]
+            low, high = wilson_interval(self.wins[name], games)
+            print(f"{name:<12} {games:>8} {self.wins[name] / max(games, 1):>9.3f}   [{low:.3f}, {high:.3f}]")
+
+        print()
+        for (a, b), games in sorted(self.pair_games.items()):
+            wins = self.pair_wins[(a, b)]
+            low, high = wilson_interval(wins, games)
+            print(f"{a} vs {b}: {a} wins {wins / games:.3f} [{low:.3f}, {high:.3f}] over {games} games")
+
+
+def run_tournament(names, games_per_matchup, workers, seed=0, chunk_size=250, num_dice=5):
+    # Results are kept per bot name, so every bot may only be entered once.
+    if len(set(names)) != len(names):
+        raise ValueError(f"bots entered more than once: {sorted(n for n in set(names) if names.count(n) > 1)}")
+    results = Results(names)
+    tasks = schedule(names, games_per_matchup, chunk_size, seed)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_matchup, pair, task_seed, num_games, num_dice) for pair, task_seed, num_games in tasks]
+        for future in as_completed(futures):
+            results.add(*future.result())
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-robin tournament between Liar's Dice bots")
+    parser.add_argument('--bots', nargs='+', default=sorted(BOTS), choices=sorted(BOTS))
+    parser.add_argument('--games', type=int, default=2000, help="games per ordered matchup")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scaling', action='store_true', help="also report games/sec for 1..workers processes")
+    args = parser.parse_args(argv)
+    if len(set(args.bots)) != len(args.bots):
+        parser.error("each bot may only be entered once")
+
+    results, elapsed = run_tournament(args.bots, args.games, args.workers, args.seed)
+    results.report()
+    print(f"\n{results.total_games()} games in {elapsed:.2f}s with {args.workers} workers "
+          f"({results.total_games() / elapsed:,.0f} games/sec)")
+
+    if args.scaling:
+        print("\nworkers  games/sec  speedup")
+        baseline = None
+        workers = 1
+        while workers <= args.workers:
+            scaled, elapsed = run_tournament(args.bots, args.games, workers, args.seed)
+            rate = scaled.total_games() / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>7}  {rate:>9,.0f}  {rate / baseline:>6.2f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()